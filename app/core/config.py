@@ -1,6 +1,8 @@
 """Application configuration using Pydantic Settings."""
 
 import json
+import os
+from functools import cached_property, lru_cache
 from typing import List
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -21,6 +23,9 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     SMTP_USER: str = ""  # Email do remetente (ex: seu-email@gmail.com)
     SMTP_PASSWORD: str = ""  # Senha de app ou senha do email
+    EMAIL_WORKERS: int = 4  # Tarefas consumindo a fila de envio de e-mails
+    EMAIL_MAX_RETRIES: int = 3  # Tentativas extras para envios que falharem
+    EMAIL_SHUTDOWN_TIMEOUT_SECONDS: float = 30.0  # Espera máxima para esvaziar a fila ao desligar
 
     # Application
     APP_NAME: str = "PetStory API"
@@ -38,12 +43,19 @@ class Settings(BaseSettings):
 
     # Gemini Model Configuration
     GEMINI_IMAGE_MODEL: str = "gemini-2.5-flash-image"  # ou "gemini-3-pro-image-preview"
+    GEMINI_MAX_CONCURRENCY: int = 4  # Chamadas simultâneas à API de imagem
+    GEMINI_RPM: int = 30  # Limite de requisições por minuto (0 = sem limite)
+    GEMINI_CACHE_ENABLED: bool = True  # Reaproveita imagens já geradas (mesma foto + prompt + modelo)
+    GEMINI_CACHE_DIR: str = "/app/data/cache/gemini"  # Cache das imagens geradas (vazio = só memória)
+    GEMINI_CACHE_MAX_DISK_MB: int = 1024  # Tamanho máximo do cache em disco; remove os mais antigos (0 = sem limite)
+    GEMINI_MAX_INPUT_EDGE: int = 1536  # Maior lado (px) das fotos enviadas ao Gemini (0 = sem redimensionar)
 
     # Mercado Pago Configuration
     MERCADOPAGO_ACCESS_TOKEN: str = ""  # Access token do Mercado Pago
     MERCADOPAGO_PUBLIC_KEY: str = ""  # Public key (opcional, para frontend)
     MERCADOPAGO_PRODUCT_PRICE: float = 47.0  # Preço do produto em reais (preço promocional)
     MERCADOPAGO_WEBHOOK_SECRET: str = ""  # Secret para validar webhooks (opcional)
+    PAYMENT_CLEANUP_INTERVAL_SECONDS: int = 3600  # Intervalo da limpeza de pagamentos antigos (0 = desativada)
 
     # Pricing Configuration
     PRODUCT_ORIGINAL_PRICE: float = 94.0  # Preço original (antes da promoção)
@@ -69,13 +81,15 @@ class Settings(BaseSettings):
         if isinstance(value, list):
             return value
         if isinstance(value, str):
-            # Try to parse as JSON first
-            try:
-                parsed = json.loads(value)
-                if isinstance(parsed, list):
-                    return [str(origin) for origin in parsed]
-            except (json.JSONDecodeError, TypeError):
-                pass
+            # Only try JSON when the value looks like an array
+            stripped = value.lstrip()
+            if stripped.startswith("["):
+                try:
+                    parsed = json.loads(stripped)
+                    if isinstance(parsed, list):
+                        return [str(origin) for origin in parsed]
+                except (json.JSONDecodeError, TypeError):
+                    pass
             # Fall back to comma-separated values
             origins = [origin.strip() for origin in value.split(",") if origin.strip()]
             # In debug mode, allow all origins for development
@@ -84,19 +98,29 @@ class Settings(BaseSettings):
             return origins
         return []
 
-    @property
+    @cached_property
     def cors_origins_list(self) -> List[str]:
-        """Get CORS origins as a list."""
+        """Get CORS origins as a list (parsed once per Settings instance)."""
         return self._parse_cors_origins(self.CORS_ORIGINS)
 
+    # Containers already inject env vars; USE_DOTENV=0 skips reading .env
     model_config = SettingsConfigDict(
-        env_file=".env",
+        env_file=None if os.getenv("USE_DOTENV", "1").lower() in ("0", "false", "no") else ".env",
         env_file_encoding="utf-8",
         case_sensitive=True,
         extra="ignore",
     )
 
 
-# Singleton instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the cached Settings instance (built on first use)."""
+    return Settings()
+
+
+def __getattr__(name: str):
+    """Resolve the ``settings`` singleton lazily on first access."""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
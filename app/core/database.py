@@ -25,6 +25,9 @@ def init_db() -> None:
     # Import models to register them with SQLModel metadata
     from app.models import Payment  # noqa: F401
     SQLModel.metadata.create_all(engine)
+    # create_all skips existing tables, so add indexes introduced later
+    for index in Payment.__table__.indexes:
+        index.create(engine, checkfirst=True)
     logger.info("Database tables created successfully")
 
 
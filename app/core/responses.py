@@ -0,0 +1,14 @@
+"""Custom response classes."""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        """Serialize content to JSON bytes."""
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,51 @@
+"""Shared service instances.
+
+Each factory builds its service once per process and caches it, so the API
+and the background worker reuse the same clients. When the app is preloaded
+(e.g. gunicorn ``preload_app=True``) the instances are created before fork.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import settings
+from app.services.email_service import EmailService
+from app.services.gemini_service import GeminiGenerator
+from app.services.payment_service import PaymentService
+from app.services.pdf_service import PDFService
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_gemini_service() -> GeminiGenerator:
+    """Return the shared GeminiGenerator instance."""
+    return GeminiGenerator()
+
+
+@lru_cache(maxsize=1)
+def get_email_service() -> EmailService:
+    """Return the shared EmailService instance."""
+    return EmailService()
+
+
+@lru_cache(maxsize=1)
+def get_pdf_service() -> PDFService:
+    """Return the shared PDFService instance (and its prepared-image cache)."""
+    return PDFService()
+
+
+@lru_cache(maxsize=1)
+def get_payment_service() -> Optional[PaymentService]:
+    """Return the shared PaymentService instance.
+
+    Returns:
+        PaymentService, or None if MERCADOPAGO_ACCESS_TOKEN is not set
+
+    Raises:
+        Exception: If the Mercado Pago SDK cannot be initialized
+    """
+    if not settings.MERCADOPAGO_ACCESS_TOKEN:
+        return None
+    return PaymentService()
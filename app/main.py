@@ -1,30 +1,41 @@
 """FastAPI application main entry point."""
 
+import asyncio
 import logging
 import os
+import tempfile
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Annotated, List, Optional
+from urllib.parse import urlencode
 
+import anyio
+import orjson
 from fastapi import (
     BackgroundTasks,
     FastAPI,
-    File,
     Form,
     HTTPException,
     Query,
     Request,
     UploadFile,
 )
-from typing import List
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
+from pydantic import BaseModel
 
 from app.core.config import settings
 from app.core.database import init_db
+from app.core.responses import ORJSONResponse
+from app.core.services import get_email_service, get_gemini_service, get_payment_service
 from app.services.email_service import EmailService
 from app.services.gemini_service import GeminiGenerator
 from app.services.payment_service import PaymentService
 from app.services.payment_storage import payment_storage
+from app.services.pdf_service import shutdown_process_pool
+from app.utils.image import SNIFF_HEADER_SIZE, log_pillow_build, sniff_image_type
+from app.utils.slug import get_unique_order_dir
 from app.worker import process_pet_story
 
 # Configure logging
@@ -33,6 +44,28 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
 logger = logging.getLogger(__name__)
+# The log format doesn't use thread/process fields - skip collecting them per record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# Accepted upload content types
+ALLOWED_CONTENT_TYPES = frozenset({"image/jpeg", "image/png", "image/webp"})
+ALLOWED_CONTENT_TYPES_STR = ", ".join(sorted(ALLOWED_CONTENT_TYPES))
+
+# Upload limits and streaming parameters
+MAX_PHOTO_SIZE = 10 * 1024 * 1024  # 10MB per photo
+UPLOAD_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024  # Keep small photos in memory, spill larger ones to disk
+
+# Payment redirect URLs (base URL normalized once)
+PAYMENT_BASE_URL = settings.API_BASE_URL.rstrip("/")
+PAYMENT_SUCCESS_URL = f"{PAYMENT_BASE_URL}/api/payment/success"
+PAYMENT_FAILURE_URL = f"{PAYMENT_BASE_URL}/api/payment/failure"
+PAYMENT_PENDING_URL = f"{PAYMENT_BASE_URL}/api/payment/pending"
+
+# Cached UTC date prefix for order stamps (refreshed when the day rolls over)
+_DATE_CACHE = {"day": None, "prefix": "", "last": -1}
 
 # Global instances (initialized in lifespan)
 gemini_service: GeminiGenerator = None
@@ -51,39 +84,63 @@ async def lifespan(app: FastAPI):
         init_db()
         logger.info("Database initialized successfully")
     except Exception as e:
-        logger.error(f"Error initializing database: {e}", exc_info=True)
+        logger.error("Error initializing database: %s", e, exc_info=True)
         raise
     
+    log_pillow_build()
+    
     # Initialize services on startup
     logger.info("Initializing services...")
     try:
-        gemini_service = GeminiGenerator()
-        email_service = EmailService()
+        gemini_service = get_gemini_service()
+        email_service = get_email_service()
         # Initialize payment service only if token is configured
         if settings.MERCADOPAGO_ACCESS_TOKEN:
             try:
-                payment_service = PaymentService()
+                payment_service = get_payment_service()
                 logger.info("Payment service initialized successfully")
             except Exception as e:
-                logger.warning(f"Payment service not available: {e}")
+                logger.warning("Payment service not available: %s", e)
                 payment_service = None
         else:
             logger.warning("MERCADOPAGO_ACCESS_TOKEN not set - payment features disabled")
             payment_service = None
         logger.info("Services initialized successfully")
     except Exception as e:
-        logger.error(f"Error initializing services: {e}", exc_info=True)
+        logger.error("Error initializing services: %s", e, exc_info=True)
         raise
     
+    # Start background email delivery
+    await email_service.start()
+    
+    # Periodically drop old payment records
+    cleanup_task = None
+    if settings.PAYMENT_CLEANUP_INTERVAL_SECONDS > 0:
+        cleanup_task = asyncio.create_task(
+            payment_storage.run_cleanup_loop(settings.PAYMENT_CLEANUP_INTERVAL_SECONDS),
+            name="payment-cleanup",
+        )
+    
     # Create temp directory if it doesn't exist
     temp_dir = Path(settings.TEMP_DIR)
     temp_dir.mkdir(parents=True, exist_ok=True)
-    logger.info(f"Temp directory ready: {temp_dir.absolute()}")
+    logger.info("Temp directory ready: %s", temp_dir.absolute())
     
     yield
     
     # Cleanup on shutdown
     logger.info("Shutting down...")
+    if cleanup_task:
+        cleanup_task.cancel()
+        await asyncio.gather(cleanup_task, return_exceptions=True)
+    if email_service:
+        await email_service.stop()
+        email_service.close()
+    if gemini_service:
+        await gemini_service.aclose()
+    if payment_service:
+        payment_service.close()
+    await asyncio.to_thread(shutdown_process_pool)
 
 
 # Create FastAPI app
@@ -92,21 +149,148 @@ app = FastAPI(
     description="API para transformar fotos de pets em desenhos de colorir",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS for frontend (GitHub Pages)
-# In debug mode, allow all origins for easier development
-cors_origins = ["*"] if settings.DEBUG else settings.cors_origins_list
+# In debug mode, allow all origins for easier development (regex is compiled once by Starlette)
+if settings.DEBUG:
+    cors_origins = []
+    cors_origin_regex = ".*"
+else:
+    cors_origins = list(dict.fromkeys(settings.cors_origins_list))  # dedupe, keep order
+    cors_origin_regex = None
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
+    allow_origin_regex=cors_origin_regex,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
+def _webhook_payment_id(payload: object) -> Optional[str]:
+    """Pull ``data.id`` out of a decoded webhook payload.
+
+    Mercado Pago sends the id either as a string or an integer; other keys
+    are ignored.
+
+    Args:
+        payload: Decoded JSON body
+
+    Returns:
+        Payment ID as a string, or None if the payload doesn't carry one
+    """
+    if not isinstance(payload, dict):
+        return None
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        return None
+    payment_id = data.get("id")
+    if payment_id is None or payment_id == "":
+        return None
+    return str(payment_id)
+
+
+def _order_stamp() -> str:
+    """Build a unique order stamp (``YYYYMMDD_<microseconds of day>``, UTC).
+
+    The date prefix is formatted once per day and the microsecond suffix is
+    forced to increase, so uploads within the same second never collide.
+
+    Returns:
+        Stamp string used in order directory and photo filenames
+    """
+    t = time.time()
+    day = int(t // 86400)
+    if _DATE_CACHE["day"] != day:
+        _DATE_CACHE.update(day=day, prefix=time.strftime("%Y%m%d", time.gmtime(t)), last=-1)
+    micros = int(t * 1_000_000) % 86_400_000_000
+    if micros <= _DATE_CACHE["last"]:
+        micros = _DATE_CACHE["last"] + 1
+    _DATE_CACHE["last"] = micros
+    return f'{_DATE_CACHE["prefix"]}_{micros:012d}'
+
+
+def _close_photo_files(photo_data_list: List[dict]) -> None:
+    """Close spooled photo files that will not reach the background task."""
+    for photo_data in photo_data_list:
+        photo_data["file"].close()
+
+
+async def _ingest_photo(idx: int, total: int, foto: UploadFile, timestamp: str) -> dict:
+    """Validate one uploaded photo and stream it into a spooled temp file.
+    
+    Args:
+        idx: 1-based position of the photo in the upload
+        total: Number of photos in the upload
+        foto: Uploaded photo file
+        timestamp: Timestamp string for this order
+        
+    Returns:
+        Photo data dict for the background task
+        
+    Raises:
+        HTTPException: If the photo is invalid, empty or too large
+    """
+    # Validate content type
+    if foto.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo de arquivo inválido: {foto.content_type} (arquivo: {foto.filename}). "
+            f"Tipos permitidos: {ALLOWED_CONTENT_TYPES_STR}",
+        )
+    
+    # Stream photo in chunks, validating size (max 10MB) as we go
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    photo_size = 0
+    try:
+        while chunk := await foto.read(UPLOAD_CHUNK_SIZE):
+            # Check the magic bytes on the first chunk - don't trust content_type alone
+            if photo_size == 0:
+                mime_type = sniff_image_type(chunk[:SNIFF_HEADER_SIZE])
+                if mime_type is None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Arquivo da foto {idx} ({foto.filename}) não é uma imagem válida. "
+                        f"Tipos permitidos: {ALLOWED_CONTENT_TYPES_STR}",
+                    )
+            photo_size += len(chunk)
+            if photo_size > MAX_PHOTO_SIZE:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Foto {idx} ({foto.filename}) excede o limite de 10MB",
+                )
+            # Past the spool threshold the file lives on disk - write off the event loop
+            if photo_size > SPOOL_MAX_SIZE:
+                await anyio.to_thread.run_sync(spooled.write, chunk)
+            else:
+                spooled.write(chunk)
+        
+        if photo_size == 0:
+            raise HTTPException(status_code=400, detail=f"Arquivo da foto {idx} está vazio")
+    except Exception:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    
+    logger.info(
+        "Received photo %d/%d: %s (%d bytes) - queued for background processing",
+        idx, total, foto.filename, photo_size,
+    )
+    
+    # Store photo data (will be saved by background task)
+    return {
+        "file": spooled,
+        "size": photo_size,
+        "mime_type": mime_type,
+        "filename": f"foto_{idx}_{timestamp}{Path(foto.filename).suffix}",
+        "original_filename": foto.filename,
+    }
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -181,32 +365,27 @@ async def create_payment(
         raise HTTPException(status_code=400, detail="Nome do pet é obrigatório")
     
     try:
-        base_url = settings.API_BASE_URL.rstrip("/")
-        success_url = f"{base_url}/api/payment/success?email={email}&pet_name={pet_name}"
-        failure_url = f"{base_url}/api/payment/failure"
-        pending_url = f"{base_url}/api/payment/pending"
+        # Query values must be URL-encoded (emails often contain "+" and "@")
+        success_url = f"{PAYMENT_SUCCESS_URL}?{urlencode({'email': email, 'pet_name': pet_name})}"
         
-        preference = payment_service.create_payment_preference(
+        preference = await payment_service.create_payment_preference(
             email=email.strip(),
             pet_name=pet_name.strip(),
             success_url=success_url,
-            failure_url=failure_url,
-            pending_url=pending_url,
+            failure_url=PAYMENT_FAILURE_URL,
+            pending_url=PAYMENT_PENDING_URL,
         )
         
         # Use sandbox URL if available (for testing), otherwise use init_point
         checkout_url = preference.get("sandbox_init_point") or preference.get("init_point")
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "success",
-                "checkout_url": checkout_url,
-                "preference_id": preference.get("id"),
-            },
-        )
+        return {
+            "status": "success",
+            "checkout_url": checkout_url,
+            "preference_id": preference.get("id"),
+        }
     except Exception as e:
-        logger.error(f"Error creating payment: {e}", exc_info=True)
+        logger.error("Error creating payment: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Erro ao criar pagamento: {str(e)}")
 
 
@@ -217,16 +396,21 @@ async def payment_webhook(request: Request):
     This endpoint receives notifications when payment status changes.
     """
     try:
-        data = await request.json()
-        logger.info(f"Received webhook: {data}")
+        raw_body = await request.body()
+        
+        # Cheap pre-check: notifications without data.id carry nothing we use
+        if b'"data"' not in raw_body or b'"id"' not in raw_body:
+            return {"status": "ignored"}
+        
+        data = orjson.loads(raw_body)
+        logger.info("Received webhook: %s", data)
         
         # Extract payment information
-        if "data" in data and "id" in data["data"]:
-            payment_id = data["data"]["id"]
-            
+        payment_id = _webhook_payment_id(data)
+        if payment_id:
             # Get payment info from Mercado Pago
             if payment_service:
-                payment_info = payment_service.get_payment_info(payment_id)
+                payment_info = await payment_service.get_payment_info(payment_id)
                 if payment_info:
                     status = payment_info.get("status")
                     email = payment_info.get("payer", {}).get("email", "")
@@ -248,13 +432,13 @@ async def payment_webhook(request: Request):
                         external_reference=external_reference,
                     )
                     
-                    logger.info(f"Payment {payment_id} status updated to {status} for {email}")
+                    logger.info("Payment %s status updated to %s for %s", payment_id, status, email)
         
-        return JSONResponse(status_code=200, content={"status": "ok"})
+        return {"status": "ok"}
         
     except Exception as e:
-        logger.error(f"Error processing webhook: {e}", exc_info=True)
-        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+        logger.error("Error processing webhook: %s", e, exc_info=True)
+        return ORJSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
 
 @app.get("/api/payment/success")
@@ -270,7 +454,7 @@ async def payment_success(
     """
     # If payment_id is provided, verify it
     if payment_id and payment_service:
-        payment_info = payment_service.get_payment_info(payment_id)
+        payment_info = await payment_service.get_payment_info(payment_id)
         if payment_info:
             status = payment_info.get("status")
             # Save payment status
@@ -282,75 +466,83 @@ async def payment_success(
             )
     
     # Return success page (frontend should redirect to upload form)
-    return JSONResponse(
-        status_code=200,
-        content={
-            "status": "success",
-            "message": "Pagamento aprovado! Agora você pode enviar as fotos do seu pet.",
-            "email": email,
-            "pet_name": pet_name,
-            "upload_url": f"/api/upload",
-        },
-    )
+    return {
+        "status": "success",
+        "message": "Pagamento aprovado! Agora você pode enviar as fotos do seu pet.",
+        "email": email,
+        "pet_name": pet_name,
+        "upload_url": f"/api/upload",
+    }
 
 
 @app.get("/api/payment/failure")
 async def payment_failure():
     """Handle failed payment redirect."""
-    return JSONResponse(
-        status_code=200,
-        content={
-            "status": "failure",
-            "message": "Pagamento não foi aprovado. Tente novamente.",
-        },
-    )
+    return {
+        "status": "failure",
+        "message": "Pagamento não foi aprovado. Tente novamente.",
+    }
 
 
 @app.get("/api/payment/pending")
 async def payment_pending():
     """Handle pending payment redirect."""
-    return JSONResponse(
-        status_code=200,
-        content={
-            "status": "pending",
-            "message": "Pagamento está sendo processado. Você receberá um e-mail quando for aprovado.",
-        },
-    )
+    return {
+        "status": "pending",
+        "message": "Pagamento está sendo processado. Você receberá um e-mail quando for aprovado.",
+    }
+
+
+class UploadForm(BaseModel):
+    """Multipart form for /api/upload, validated in a single model pass.
+
+    Attributes:
+        nome_pet: Pet's name
+        pet_date: Pet's date/birthday
+        pet_story: Pet's story/biography
+        email: Recipient email address
+        fotos: List of uploaded pet photo files (1-10 photos)
+        payment_id: Optional payment ID to verify payment
+    """
+
+    nome_pet: str
+    pet_date: str
+    pet_story: str
+    email: str
+    fotos: List[UploadFile]
+    payment_id: Optional[str] = None
 
 
 @app.post("/api/upload")
 async def upload_pet_story(
     background_tasks: BackgroundTasks,
-    nome_pet: str = Form(...),
-    pet_date: str = Form(...),
-    pet_story: str = Form(...),
-    email: str = Form(...),
-    fotos: List[UploadFile] = File(...),
-    payment_id: str = Form(None),  # Optional payment ID for verification
+    form: Annotated[UploadForm, Form()],
 ):
     """Process pet story submission with multiple photos.
     
     Args:
         background_tasks: FastAPI background tasks
-        nome_pet: Pet's name
-        pet_date: Pet's date/birthday
-        pet_story: Pet's story/biography
-        email: Recipient email address
-        fotos: List of uploaded pet photo files (1-10 photos)
-        payment_id: Optional payment ID to verify payment
+        form: Submitted form fields and photos
         
     Returns:
         JSON response with job status
     """
+    # Strip text fields once and reuse them below
+    nome_pet = form.nome_pet.strip()
+    pet_date = form.pet_date.strip()
+    pet_story = form.pet_story.strip()
+    email = form.email.strip()
+    fotos, payment_id = form.fotos, form.payment_id
+    
     # Validate email
     if not email or "@" not in email:
         raise HTTPException(status_code=400, detail="Email inválido")
     
     # Validate required fields
-    if not nome_pet or not nome_pet.strip():
+    if not nome_pet:
         raise HTTPException(status_code=400, detail="Nome do pet é obrigatório")
     
-    if not pet_story or not pet_story.strip():
+    if not pet_story:
         raise HTTPException(status_code=400, detail="História do pet é obrigatória")
     
     # Verify payment if payment service is enabled
@@ -359,16 +551,26 @@ async def upload_pet_story(
     # if payment_service:
     #     payment_verified = False
     #     
-    #     # If payment_id is provided, verify it
-    #     if payment_id:
-    #         if payment_service.is_payment_approved(payment_id):
-    #             payment_verified = True
-    #             logger.info(f"Payment {payment_id} verified for {email}")
-    #     else:
-    #         # Check if user has any approved payment for this pet
-    #         if payment_storage.can_upload(email, nome_pet):
-    #             payment_verified = True
-    #             logger.info(f"Payment verified from storage for {email} - {nome_pet}")
+    #     # Check local storage first - only hit Mercado Pago on a miss
+    #     # (storage calls are blocking DB queries - keep them off the event loop)
+    #     if payment_id and await asyncio.to_thread(payment_storage.is_payment_approved, payment_id):
+    #         payment_verified = True
+    #         logger.info("Payment %s verified from storage for %s", payment_id, email)
+    #     elif await asyncio.to_thread(payment_storage.can_upload, email, nome_pet):
+    #         # User has an approved payment for this pet
+    #         payment_verified = True
+    #         logger.info("Payment verified from storage for %s - %s", email, nome_pet)
+    #     elif payment_id and await payment_service.is_payment_approved(payment_id):
+    #         # Remember the remote result so re-uploads don't need another round-trip
+    #         await asyncio.to_thread(
+    #             payment_storage.save_payment,
+    #             payment_id=payment_id,
+    #             status="approved",
+    #             email=email,
+    #             pet_name=nome_pet,
+    #         )
+    #         payment_verified = True
+    #         logger.info("Payment %s verified for %s", payment_id, email)
     #     
     #     if not payment_verified:
     #         raise HTTPException(
@@ -383,87 +585,64 @@ async def upload_pet_story(
     if len(fotos) > 10:
         raise HTTPException(status_code=400, detail="Máximo de 10 fotos permitidas")
     
-    allowed_content_types = {"image/jpeg", "image/jpg", "image/png", "image/webp"}
-    photo_paths = []
+    # Photos are spooled here and handed over to the background task
+    photo_data_list = []
     
     try:
-        # Create unique temp directory for this order
-        from app.utils.slug import get_unique_order_dir
-        from datetime import datetime
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Reserve a unique temp directory for this order (created by the background task)
+        timestamp = _order_stamp()
         order_temp_dir = get_unique_order_dir(
             base_dir=settings.TEMP_DIR,
             email=email,
             pet_name=nome_pet,
             timestamp=timestamp
         )
-        Path(order_temp_dir).mkdir(parents=True, exist_ok=True)
-        
-        logger.info(f"Created unique order directory: {order_temp_dir} for {nome_pet} ({email})")
         
-        # Read photos into memory (don't save to disk yet - let background task do it)
-        # This allows the API to return immediately
-        photo_data_list = []
+        logger.info("Assigned order directory: %s for %s (%s)", order_temp_dir, nome_pet, email)
         
-        for idx, foto in enumerate(fotos, 1):
-            # Validate content type
-            if foto.content_type not in allowed_content_types:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Tipo de arquivo inválido: {foto.content_type} (arquivo: {foto.filename}). "
-                    f"Tipos permitidos: {', '.join(allowed_content_types)}",
-                )
-            
-            # Read photo into memory
-            photo_bytes = await foto.read()
-            if len(photo_bytes) == 0:
-                raise HTTPException(status_code=400, detail=f"Arquivo da foto {idx} está vazio")
-            
-            # Validate image size (max 10MB)
-            if len(photo_bytes) > 10 * 1024 * 1024:
-                raise HTTPException(status_code=400, detail=f"Foto {idx} ({foto.filename}) excede o limite de 10MB")
-            
-            # Store photo data (will be saved by background task)
-            photo_filename = f"foto_{idx}_{timestamp}{Path(foto.filename).suffix}"
-            photo_data_list.append({
-                "bytes": photo_bytes,
-                "filename": photo_filename,
-                "original_filename": foto.filename,
-            })
-            
-            logger.info(f"Received photo {idx}/{len(fotos)}: {foto.filename} ({len(photo_bytes)} bytes) - queued for background processing")
+        # Stream photos into spooled temp files concurrently (don't save to order dir yet -
+        # let background task do it). This allows the API to return immediately.
+        results = await asyncio.gather(
+            *(
+                _ingest_photo(idx, len(fotos), foto, timestamp)
+                for idx, foto in enumerate(fotos, 1)
+            ),
+            return_exceptions=True,
+        )
+        photo_data_list = [r for r in results if not isinstance(r, BaseException)]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
         
         # Add background task with photo data (not paths)
         # The background task will save photos to disk and process them
         background_tasks.add_task(
             process_pet_story,
-            nome_pet=nome_pet.strip(),
-            pet_date=pet_date.strip(),
-            pet_story=pet_story.strip(),
-            email=email.strip(),
+            nome_pet=nome_pet,
+            pet_date=pet_date,
+            pet_story=pet_story,
+            email=email,
             order_temp_dir=order_temp_dir,
             photo_data_list=photo_data_list,
             timestamp=timestamp,
         )
         
-        logger.info(f"Background task queued for {nome_pet} ({email}) with {len(photo_data_list)} photos")
+        logger.info("Background task queued for %s (%s) with %d photos", nome_pet, email, len(photo_data_list))
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "success",
-                "message": f"História de {nome_pet} está sendo processada! Você receberá um e-mail em {email} quando estiver pronta.",
-                "nome_pet": nome_pet,
-                "email": email,
-                "fotos_count": len(photo_data_list),
-            },
-        )
+        return {
+            "status": "success",
+            "message": f"História de {nome_pet} está sendo processada! Você receberá um e-mail em {email} quando estiver pronta.",
+            "nome_pet": nome_pet,
+            "email": email,
+            "fotos_count": len(photo_data_list),
+        }
         
     except HTTPException:
+        _close_photo_files(photo_data_list)
         raise
     except Exception as e:
-        logger.error(f"Error processing upload: {e}", exc_info=True)
+        _close_photo_files(photo_data_list)
+        logger.error("Error processing upload: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Erro ao processar upload: {str(e)}")
 
 
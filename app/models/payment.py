@@ -3,6 +3,7 @@
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -13,6 +14,10 @@ class Payment(SQLModel, table=True):
     """
     
     __tablename__ = "payments"
+    __table_args__ = (
+        # Covers PaymentStorage.can_upload (email + pet + status, newest window)
+        Index("ix_payments_owner_status_created", "email", "pet_name", "status", "created_at"),
+    )
     
     # Primary key
     id: Optional[int] = Field(default=None, primary_key=True)
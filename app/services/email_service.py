@@ -1,14 +1,25 @@
 """Email service for sending PDFs via SMTP (native Python)."""
 
+import asyncio
+import atexit
+import base64
 import logging
-import os
+import logging.handlers
+import queue
+import re
 import smtplib
-from datetime import datetime
+import socket
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from email.mime.application import MIMEApplication
+from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from app.core.config import settings
 
@@ -20,9 +31,9 @@ email_logger.setLevel(logging.DEBUG)
 logs_dir = Path("logs")
 logs_dir.mkdir(exist_ok=True)
 
-# File handler for email.log
+# File handler for email.log (WatchedFileHandler reopens the file after logrotate)
 email_log_file = logs_dir / "email.log"
-file_handler = logging.FileHandler(email_log_file, encoding="utf-8")
+file_handler = logging.handlers.WatchedFileHandler(email_log_file, encoding="utf-8")
 file_handler.setLevel(logging.DEBUG)
 
 # Format for file logging
@@ -32,13 +43,450 @@ file_formatter = logging.Formatter(
 )
 file_handler.setFormatter(file_formatter)
 
-# Add handler to logger (avoid duplicates)
+# Batch writes: records are buffered and flushed every 256 records, immediately
+# on WARNING, and at least every EMAIL_LOG_FLUSH_INTERVAL_SECONDS so a killed
+# process loses at most a few seconds of email.log
+EMAIL_LOG_FLUSH_INTERVAL_SECONDS = 5.0
+email_log_buffer = logging.handlers.MemoryHandler(
+    capacity=256, flushLevel=logging.WARNING, target=file_handler
+)
+_email_log_flush_stop = threading.Event()
+
+
+def _flush_email_log_periodically() -> None:
+    """Flush buffered email.log records on a timer until shutdown."""
+    while not _email_log_flush_stop.wait(EMAIL_LOG_FLUSH_INTERVAL_SECONDS):
+        email_log_buffer.flush()
+
+
+def _shutdown_email_logging() -> None:
+    """Drain the log queue and flush buffered records to email.log."""
+    _email_log_flush_stop.set()
+    _email_log_listener.stop()
+    email_log_buffer.flush()
+
+
+# Add handler to logger (avoid duplicates). Records go through a queue so the
+# file write happens on the listener thread, not in the sending code.
 if not email_logger.handlers:
-    email_logger.addHandler(file_handler)
+    _email_log_queue = queue.SimpleQueue()
+    email_logger.addHandler(logging.handlers.QueueHandler(_email_log_queue))
+    _email_log_listener = logging.handlers.QueueListener(
+        _email_log_queue, email_log_buffer, respect_handler_level=True
+    )
+    _email_log_listener.start()
+    threading.Thread(
+        target=_flush_email_log_periodically, name="email-log-flush", daemon=True
+    ).start()
+    atexit.register(_shutdown_email_logging)
 
 # Also use standard logger for console output
 logger = logging.getLogger(__name__)
 
+# SMTP connection pool limits
+SMTP_POOL_MAX_SIZE = 5
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+SMTP_IDLE_TTL_SECONDS = 60.0
+
+# TLS context for STARTTLS, built once (loading the CA bundle is not cheap)
+_SSL_CONTEXT = ssl.create_default_context()
+
+# Resolved SMTP server addresses: host -> (expires at (monotonic), getaddrinfo results)
+SMTP_DNS_TTL_SECONDS = 900.0
+_dns_cache: Dict[str, Tuple[float, List[tuple]]] = {}
+_dns_cache_lock = threading.Lock()
+
+
+def _resolve_host(host: str, port: int) -> List[tuple]:
+    """Resolve ``host`` with getaddrinfo, caching every address for SMTP_DNS_TTL_SECONDS."""
+    now = time.monotonic()
+    with _dns_cache_lock:
+        cached = _dns_cache.get(host)
+    if cached and cached[0] > now:
+        return cached[1]
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    with _dns_cache_lock:
+        _dns_cache[host] = (now + SMTP_DNS_TTL_SECONDS, infos)
+    return infos
+
+
+class _CachedDNSSMTP(smtplib.SMTP):
+    """SMTP client that connects to the cached addresses of the server host.
+
+    Only the socket target changes; the hostname is still used for EHLO and
+    for TLS certificate verification.
+    """
+
+    def _get_socket(self, host, port, timeout):
+        # Same as socket.create_connection: try each address until one connects
+        if timeout is not None and not timeout:
+            raise ValueError("Non-blocking socket (timeout=0) is not supported")
+        last_error: Optional[OSError] = None
+        for family, socktype, proto, _, sockaddr in _resolve_host(host, port):
+            sock = socket.socket(family, socktype, proto)
+            try:
+                if timeout is not None:
+                    sock.settimeout(timeout)
+                if self.source_address:
+                    sock.bind(self.source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                sock.close()
+                last_error = e
+        # Every address failed - the cached records may be stale, resolve again next time
+        with _dns_cache_lock:
+            _dns_cache.pop(host, None)
+        raise last_error or OSError(f"getaddrinfo returned no addresses for {host}")
+
+
+class _SMTPPool:
+    """Thread-safe pool of authenticated SMTP connections for one account.
+
+    Connections are validated with NOOP on checkout and replaced when the
+    server dropped them, went idle for too long or reached the per-connection
+    message limit. Sends run in worker threads, hence the threading lock.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        user: str,
+        password: str,
+        max_size: int = SMTP_POOL_MAX_SIZE,
+        max_messages_per_connection: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+        idle_ttl: float = SMTP_IDLE_TTL_SECONDS,
+    ):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.max_size = max_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_ttl = idle_ttl
+        # Idle entries: [connection, messages sent, last used (monotonic)]
+        self._idle: List[list] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open a new connection, start TLS and log in."""
+        email_logger.info("Connecting to SMTP server %s:%s...", self.server, self.port)
+        conn = _CachedDNSSMTP(self.server, self.port, timeout=30)
+        try:
+            # Enable debug (optional, can be removed in production)
+            if settings.DEBUG:
+                conn.set_debuglevel(1)
+            conn.starttls(context=_SSL_CONTEXT)
+            conn.login(self.user, self.password)
+        except Exception:
+            self._close(conn)
+            raise
+        if email_logger.isEnabledFor(logging.DEBUG):
+            email_logger.debug("SMTP connection ready (TLS + login)")
+        return conn
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP) -> None:
+        """Close a connection, ignoring errors from an already dead socket."""
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def _checkout(self) -> list:
+        """Take a live idle connection from the pool or open a new one."""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                entry = self._idle.pop()
+            if now - entry[2] > self.idle_ttl:
+                self._close(entry[0])
+                continue
+            try:
+                if entry[0].noop()[0] == 250:
+                    return entry
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close(entry[0])
+        return [self._connect(), 0, now]
+
+    def _release(self, entry: list) -> None:
+        """Return a connection to the pool, or close it if it can't be reused."""
+        entry[1] += 1
+        entry[2] = time.monotonic()
+        if entry[1] < self.max_messages_per_connection:
+            with self._lock:
+                if len(self._idle) < self.max_size:
+                    self._idle.append(entry)
+                    return
+        self._close(entry[0])
+
+    @contextmanager
+    def acquire(self) -> Iterator[smtplib.SMTP]:
+        """Borrow an authenticated connection for the duration of the block.
+
+        A connection that raised inside the block is discarded, since its
+        SMTP session state is unknown.
+        """
+        entry = self._checkout()
+        try:
+            yield entry[0]
+        except BaseException:
+            self._close(entry[0])
+            raise
+        self._release(entry)
+
+    def close_all(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._close(conn)
+
+
+# Email HTML bodies, built once at import; placeholders are filled with str.format
+_PDF_BODY_HTML = """
+<html>
+    <body style="font-family: Arial, sans-serif; padding: 20px;">
+        <h2>Seu livro de colorir PetStory está pronto! 🎨</h2>
+        <p>Olá!</p>
+        <p>Seu livro de colorir personalizado com seus pets foi gerado com sucesso.</p>
+        <p>Você pode encontrar o PDF anexado neste email.</p>
+        <p>Divirta-se colorindo! 🐾</p>
+        <hr>
+        <p style="color: #666; font-size: 12px;">
+            PetStory - Transformando memórias em arte
+        </p>
+    </body>
+</html>
+"""
+
+_QR_CODE_HTML_TEMPLATE = """
+<div style="text-align: center; margin: 30px 0; padding: 20px; background-color: #f9fafb; border-radius: 10px;">
+    <h3 style="color: #7c3aed; margin-bottom: 15px;">🌐 Acesse o Site de Homenagem</h3>
+    <p style="color: #666; margin-bottom: 20px;">Escaneie o QR Code abaixo ou clique no link:</p>
+    <img src="{qr_base64}" 
+         alt="QR Code - Site de Homenagem" 
+         style="width: 200px; height: 200px; margin: 20px auto; display: block; border: 3px solid #7c3aed; border-radius: 10px; padding: 10px; background-color: white;">
+    <p style="margin-top: 20px;">
+        <a href="{homenagem_url}" 
+           style="color: #7c3aed; text-decoration: none; font-weight: bold; font-size: 14px;">
+            {homenagem_url}
+        </a>
+    </p>
+</div>
+"""
+
+_QR_LINK_FALLBACK_HTML_TEMPLATE = """
+<div style="text-align: center; margin: 30px 0;">
+    <p><a href="{homenagem_url}" style="color: #7c3aed;">Acesse o site de homenagem: {homenagem_url}</a></p>
+</div>
+"""
+
+_PET_STORY_HTML_TEMPLATE = """
+<html>
+    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f5f5f5;">
+        <div style="max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 10px;">
+            <h2 style="color: #7c3aed;">🎉 O Kit Digital do {pet_name} está pronto!</h2>
+            <p>Olá!</p>
+            <p>Ficamos felizes em compartilhar que o kit digital personalizado do <strong>{pet_name}</strong> foi criado com sucesso!</p>
+            <p>Você encontrará anexo:</p>
+            <ul>
+                <li><strong>PDF do Kit Digital</strong> - com capa, biografia, página para colorir e adesivos</li>
+            </ul>
+            {qr_code_html}
+            <p>Divirta-se colorindo e compartilhando as memórias do {pet_name}! 🐾</p>
+            <hr style="margin: 30px 0; border: none; border-top: 1px solid #e0e0e0;">
+            <p style="color: #666; font-size: 12px; text-align: center;">
+                PetStory - Transformando memórias em arte<br>
+                Criado com ❤️ para você
+            </p>
+        </div>
+    </body>
+</html>
+"""
+
+# The PDF attachment is streamed to the server in base64 instead of being
+# encoded into the message up front; a marker stands in for its body.
+_ATTACHMENT_MARKER = b"__PETSTORY_ATTACHMENT_BODY__"
+_BASE64_CHUNK_SIZE = 57 * 1024  # multiple of 57 bytes -> whole 76-char lines
+_BDAT_CHUNK_SIZE = 1024 * 1024  # raw bytes per BDAT command (RFC 3030)
+_LEADING_DOT_RE = re.compile(rb"(?m)^\.")
+# Stand-in "To:" value for batch templates, replaced per recipient
+_TO_PLACEHOLDER = "__PETSTORY_TO__"
+
+
+def _pdf_attachment_part(pdf_filename: str) -> MIMEBase:
+    """Build the PDF attachment part with a placeholder body."""
+    part = MIMEBase("application", "pdf")
+    part["Content-Transfer-Encoding"] = "base64"
+    part.add_header("Content-Disposition", "attachment", filename=pdf_filename)
+    part.set_payload(_ATTACHMENT_MARKER.decode("ascii"))
+    return part
+
+
+def _iter_base64_lines(data: bytes) -> Iterator[bytes]:
+    """Yield ``data`` base64-encoded as CRLF-terminated lines, chunk by chunk."""
+    view = memoryview(data)
+    for start in range(0, len(view), _BASE64_CHUNK_SIZE):
+        chunk = base64.encodebytes(view[start:start + _BASE64_CHUNK_SIZE])
+        yield chunk.replace(b"\n", b"\r\n")
+
+
+def _encode_attachment(data: bytes) -> bytes:
+    """Base64-encode an attachment once, as CRLF-terminated lines."""
+    return b"".join(_iter_base64_lines(data))
+
+
+def _set_attachment_cte(msg: MIMEMultipart, cte: str) -> None:
+    """Set the Content-Transfer-Encoding of the placeholder attachment part."""
+    marker = _ATTACHMENT_MARKER.decode("ascii")
+    for part in msg.get_payload():
+        if part.get_payload() == marker:
+            part.replace_header("Content-Transfer-Encoding", cte)
+            return
+
+
+def _bdat(server: smtplib.SMTP, data: bytes, last: bool = False) -> None:
+    """Send one BDAT chunk and check the reply."""
+    server.putcmd("bdat", f"{len(data)} LAST" if last else str(len(data)))
+    server.send(data)
+    code, resp = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+
+
+def _stream_message(
+    server: smtplib.SMTP,
+    from_addr: str,
+    to_addr: str,
+    msg: MIMEMultipart,
+    attachment: bytes,
+    attachment_base64: Optional[bytes] = None,
+) -> dict:
+    """Send ``msg`` over ``server``, streaming ``attachment`` into its placeholder.
+
+    Mirrors smtplib's sendmail (MAIL/RCPT/DATA) but writes the base64 body
+    straight to the socket, so the encoded PDF never exists as one buffer.
+    When the server supports CHUNKING and BINARYMIME, the PDF is sent raw
+    with BDAT instead, skipping base64 (a third fewer bytes on the wire).
+
+    Args:
+        server: Connected, authenticated SMTP connection
+        from_addr: Envelope sender
+        to_addr: Envelope recipient
+        msg: Message whose attachment part holds the placeholder body
+        attachment: Raw attachment bytes
+        attachment_base64: Already encoded attachment (from _encode_attachment); skips re-encoding
+
+    Returns:
+        Refused recipients (always empty - a refusal raises)
+
+    Raises:
+        smtplib.SMTPException: If the server rejects the sender, recipient or data
+    """
+    server.ehlo_or_helo_if_needed()
+    binary = server.has_extn("chunking") and server.has_extn("binarymime")
+    if binary:
+        _set_attachment_cte(msg, "binary")
+    
+    # Same serialization policy smtplib's send_message uses
+    raw = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+    head, tail = raw.split(_ATTACHMENT_MARKER, 1)
+    
+    code, resp = server.mail(from_addr, ["BODY=BINARYMIME"] if binary else [])
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    code, resp = server.rcpt(to_addr)
+    if code not in (250, 251):
+        raise smtplib.SMTPRecipientsRefused({to_addr: (code, resp)})
+    
+    if binary:
+        _bdat(server, head)
+        view = memoryview(attachment)
+        for start in range(0, len(view), _BDAT_CHUNK_SIZE):
+            _bdat(server, view[start:start + _BDAT_CHUNK_SIZE])
+        _bdat(server, tail, last=True)
+        return {}
+    
+    server.putcmd("data")
+    code, resp = server.getreply()
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+    
+    # Base64 lines never start with "." so only head/tail need dot-stuffing
+    server.send(_LEADING_DOT_RE.sub(b"..", head))
+    if attachment_base64 is not None:
+        server.send(attachment_base64)
+    else:
+        for lines in _iter_base64_lines(attachment):
+            server.send(lines)
+    tail = _LEADING_DOT_RE.sub(b"..", tail.lstrip(b"\r\n"))
+    if not tail.endswith(b"\r\n"):
+        tail += b"\r\n"
+    server.send(tail + b".\r\n")
+    code, resp = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return {}
+
+
+def _is_transient_smtp_error(error: BaseException) -> bool:
+    """Tell whether a failed send may succeed if tried again later.
+
+    Dropped connections, timeouts and 4xx replies are transient; 5xx replies,
+    rejected credentials, certificate errors and bugs in the message are not.
+
+    Args:
+        error: Exception raised while sending
+
+    Returns:
+        True if the send is worth retrying
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, (smtplib.SMTPException, ssl.SSLCertVerificationError)):
+        return False
+    # Connection refused/reset, unreachable network, timeouts
+    return isinstance(error, OSError)
+
+
+@dataclass
+class EmailJob:
+    """A queued pet story email (see EmailService.send_pet_story_email)."""
+
+    to_email: str
+    pet_name: str
+    pdf_bytes: bytes
+    html_content: str
+    pdf_filename: str = "kit_digital.pdf"
+    homenagem_url: Optional[str] = None
+    attempts: int = 0
+    # Base64 attachment, encoded once when the first attempt fails
+    pdf_base64: Optional[bytes] = None
+
+
+_smtp_pools: Dict[Tuple[str, int, str], _SMTPPool] = {}
+_smtp_pools_lock = threading.Lock()
+
+
+def _get_smtp_pool(server: str, port: int, user: str, password: str) -> _SMTPPool:
+    """Return the shared pool for an SMTP account, creating it on first use."""
+    key = (server, port, user)
+    with _smtp_pools_lock:
+        pool = _smtp_pools.get(key)
+        if pool is None:
+            pool = _smtp_pools[key] = _SMTPPool(server, port, user, password)
+        return pool
+
 
 class EmailService:
     """Service for sending emails via SMTP."""
@@ -65,9 +513,20 @@ class EmailService:
         self.from_email = settings.EMAIL_FROM
         self.from_name = settings.EMAIL_FROM_NAME
         
+        # Background send queue (see start())
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Scheduled retries: timer handle -> job it re-queues
+        self._retries: Dict[asyncio.TimerHandle, EmailJob] = {}
+        self._stopping = False
+        
         # Check if SMTP is configured
-        if self.smtp_user and self.smtp_password:
-            self.enabled = True
+        self._pool: Optional[_SMTPPool] = None
+        if self.enabled:
+            self._pool = _get_smtp_pool(
+                self.smtp_server, self.smtp_port, self.smtp_user, self.smtp_password
+            )
             msg = (
                 f"Email service initialized with SMTP server: {self.smtp_server}:{self.smtp_port} | "
                 f"From: {self.from_email} | User: {self.smtp_user}"
@@ -75,7 +534,6 @@ class EmailService:
             logger.info(msg)
             email_logger.info(msg)
         else:
-            self.enabled = False
             msg = (
                 "SMTP credentials not provided, email service will log only. "
                 f"SMTP_USER: {'Set' if self.smtp_user else 'Not set'}, "
@@ -84,6 +542,302 @@ class EmailService:
             logger.warning(msg)
             email_logger.warning(msg)
 
+    @property
+    def enabled(self) -> bool:
+        """Whether SMTP credentials are configured.
+        
+        Callers can check this before building attachments that would only
+        be discarded by the simulated (log-only) send.
+        """
+        return bool(self.smtp_user and self.smtp_password)
+
+    async def start(self, workers: Optional[int] = None) -> None:
+        """Start the background send queue on the running event loop.
+        
+        Args:
+            workers: Number of consumer tasks. If None, uses settings.EMAIL_WORKERS
+        """
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._consume_queue(), name=f"email-worker-{i}")
+            for i in range(workers or settings.EMAIL_WORKERS)
+        ]
+        logger.info("Email queue started with %s worker(s)", len(self._workers))
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Deliver pending jobs, then stop the queue consumers.
+        
+        Scheduled retries are moved back into the queue and the queue is given
+        up to ``timeout`` seconds to drain; failures are retried right away
+        meanwhile. Jobs still pending after that are dropped and logged.
+        
+        Args:
+            timeout: Seconds to wait for the queue to drain. If None, uses
+                settings.EMAIL_SHUTDOWN_TIMEOUT_SECONDS
+        """
+        if not self._workers:
+            return
+        self._stopping = True
+        for handle, job in list(self._retries.items()):
+            handle.cancel()
+            self._queue.put_nowait(job)
+        self._retries.clear()
+        
+        if timeout is None:
+            timeout = settings.EMAIL_SHUTDOWN_TIMEOUT_SECONDS
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Email queue did not drain within %ss - dropping pending emails", timeout)
+        
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        while not self._queue.empty():
+            self._log_dropped(self._queue.get_nowait())
+        self._workers = []
+        self._queue = None
+        self._loop = None
+        self._stopping = False
+
+    @staticmethod
+    def _log_dropped(job: EmailJob) -> None:
+        """Record an email that was never delivered."""
+        msg = f"Email to {job.to_email} for pet {job.pet_name} dropped on shutdown (not sent)"
+        logger.error(msg)
+        email_logger.error(msg)
+
+    def _schedule_retry(self, job: EmailJob, delay: float) -> None:
+        """Put a job back in the queue after ``delay`` seconds."""
+        if self._stopping:
+            # Shutting down: retry now, within the drain window
+            self._queue.put_nowait(job)
+            return
+        
+        def requeue() -> None:
+            del self._retries[handle]
+            self._queue.put_nowait(job)
+        
+        handle = self._loop.call_later(delay, requeue)
+        self._retries[handle] = job
+
+    def enqueue_pet_story_email(self, job: EmailJob) -> bool:
+        """Queue a pet story email for background delivery.
+        
+        Safe to call from any thread.
+        
+        Args:
+            job: Email to send
+            
+        Returns:
+            True if queued, False if the queue isn't running (send inline instead)
+        """
+        loop, queue = self._loop, self._queue
+        if queue is None or loop is None or loop.is_closed():
+            return False
+        loop.call_soon_threadsafe(queue.put_nowait, job)
+        email_logger.info("Queued email to %s for pet %s", job.to_email, job.pet_name)
+        return True
+
+    async def _consume_queue(self) -> None:
+        """Send queued jobs, re-queueing transient failures with exponential backoff."""
+        while True:
+            job = await self._queue.get()
+            try:
+                sent, retryable = await self._send_pet_story_email(
+                    to_email=job.to_email,
+                    pet_name=job.pet_name,
+                    pdf_bytes=job.pdf_bytes,
+                    html_content=job.html_content,
+                    pdf_filename=job.pdf_filename,
+                    homenagem_url=job.homenagem_url,
+                    pdf_base64=job.pdf_base64,
+                )
+                if sent:
+                    continue
+                if not retryable:
+                    logger.error(
+                        "Email to %s for pet %s failed permanently, not retrying",
+                        job.to_email, job.pet_name,
+                    )
+                elif job.attempts < settings.EMAIL_MAX_RETRIES:
+                    job.attempts += 1
+                    if job.pdf_base64 is None:
+                        # Retries reuse the encoded attachment instead of re-encoding
+                        job.pdf_base64 = await asyncio.to_thread(_encode_attachment, job.pdf_bytes)
+                    delay = 2 ** job.attempts
+                    logger.warning(
+                        "Email to %s failed, retrying in %ss (attempt %d/%d)",
+                        job.to_email, delay, job.attempts, settings.EMAIL_MAX_RETRIES,
+                    )
+                    self._schedule_retry(job, delay)
+            except asyncio.CancelledError:
+                # Cancelled mid-send by stop(); the send thread may still finish it
+                logger.error(
+                    "Email to %s for pet %s interrupted on shutdown (may not have been sent)",
+                    job.to_email, job.pet_name,
+                )
+                raise
+            except Exception as e:
+                logger.error("Email worker error for %s: %s", job.to_email, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def send_many(
+        self,
+        jobs: List[EmailJob],
+        concurrency: int = SMTP_POOL_MAX_SIZE,
+        max_per_second: Optional[float] = None,
+    ) -> List[bool]:
+        """Send several pet story emails in parallel over separate SMTP sessions.
+        
+        A single SMTP session is sequential, so up to ``concurrency`` pooled
+        connections are used at once.
+        
+        Args:
+            jobs: Emails to send
+            concurrency: Number of parallel SMTP sessions
+            max_per_second: Optional overall send rate limit (provider quota)
+            
+        Returns:
+            Send result for each job, in the same order as ``jobs``
+        """
+        results: List[bool] = [False] * len(jobs)
+        pending = list(enumerate(jobs))
+        pending.reverse()  # pop() from the end keeps the original order
+        interval = 1.0 / max_per_second if max_per_second else 0.0
+        next_slot = 0.0
+        loop = asyncio.get_running_loop()
+        
+        async def shard() -> None:
+            nonlocal next_slot
+            while pending:
+                idx, job = pending.pop()
+                if interval:
+                    now = loop.time()
+                    wait = next_slot - now
+                    next_slot = max(now, next_slot) + interval
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                results[idx] = await self.send_pet_story_email(
+                    to_email=job.to_email,
+                    pet_name=job.pet_name,
+                    pdf_bytes=job.pdf_bytes,
+                    html_content=job.html_content,
+                    pdf_filename=job.pdf_filename,
+                    homenagem_url=job.homenagem_url,
+                )
+        
+        await asyncio.gather(*(shard() for _ in range(min(concurrency, len(jobs)))))
+        return results
+
+    def close(self) -> None:
+        """Close pooled SMTP connections (call on application shutdown)."""
+        if self._pool:
+            self._pool.close_all()
+
+    def _send_message(
+        self,
+        msg: MIMEMultipart,
+        to_email: str,
+        pdf_bytes: bytes,
+        pdf_base64: Optional[bytes] = None,
+    ) -> dict:
+        """Send a message over a pooled connection (blocking).
+        
+        Args:
+            msg: Message built with _pdf_attachment_part
+            to_email: Recipient email address
+            pdf_bytes: PDF streamed into the attachment part
+            pdf_base64: Optional pre-encoded PDF (see _encode_attachment)
+            
+        Returns:
+            Refused recipients (empty on success)
+        """
+        with self._pool.acquire() as server:
+            return _stream_message(server, self.from_email, to_email, msg, pdf_bytes, pdf_base64)
+
+    def _send_template(self, template: bytes, recipients: List[str]) -> List[bool]:
+        """Send one pre-serialized message to each recipient (blocking).
+        
+        Args:
+            template: Serialized message with _TO_PLACEHOLDER in its To header
+            recipients: Recipient email addresses
+            
+        Returns:
+            Send result for each recipient; recipients not reached before the
+            connection failed are False
+        """
+        results = [False] * len(recipients)
+        placeholder = _TO_PLACEHOLDER.encode("ascii")
+        try:
+            with self._pool.acquire() as server:
+                for idx, to_email in enumerate(recipients):
+                    try:
+                        server.sendmail(
+                            self.from_email, [to_email], template.replace(placeholder, to_email.encode(), 1)
+                        )
+                        results[idx] = True
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                        # The server refused this message only; the session is still usable
+                        logger.error("SMTP error sending to %s: %s", to_email, e)
+        except (smtplib.SMTPException, OSError) as e:
+            logger.error(
+                "SMTP error occurred after %s/%s recipient(s): %s",
+                sum(results), len(recipients), e,
+            )
+        return results
+
+    async def send_pdf_batch(
+        self,
+        recipients: List[str],
+        subject: str,
+        pdf_bytes: bytes,
+        pdf_filename: str = "livro_pet.pdf",
+    ) -> List[bool]:
+        """Send the same PDF email to many recipients.
+        
+        The message (including the base64-encoded PDF) is built and serialized
+        once; only the To header changes per recipient.
+        
+        Args:
+            recipients: Recipient email addresses
+            subject: Email subject
+            pdf_bytes: PDF file as bytes
+            pdf_filename: Name for the PDF attachment
+            
+        Returns:
+            Send result for each recipient, in the same order as ``recipients``
+        """
+        if not self.enabled:
+            logger.info(
+                "[SIMULATED] Would send PDF (%d bytes) as %s to %d recipient(s) | Subject: %s",
+                len(pdf_bytes), pdf_filename, len(recipients), subject,
+            )
+            return [True] * len(recipients)
+        
+        msg = MIMEMultipart("mixed")
+        msg["From"] = f"{self.from_name} <{self.from_email}>"
+        msg["To"] = _TO_PLACEHOLDER
+        msg["Subject"] = subject
+        msg.attach(MIMEText(_PDF_BODY_HTML, "html", "utf-8"))
+        attachment = MIMEApplication(pdf_bytes, _subtype="pdf")
+        attachment.add_header("Content-Disposition", "attachment", filename=pdf_filename)
+        msg.attach(attachment)
+        template = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+        
+        try:
+            results = await asyncio.to_thread(self._send_template, template, recipients)
+        except Exception as e:
+            logger.error("Unexpected error sending email batch: %s", e, exc_info=True)
+            return [False] * len(recipients)
+        
+        logger.info("PDF batch sent to %s/%s recipient(s)", sum(results), len(recipients))
+        return results
+
     async def send_pdf(
         self, to_email: str, subject: str, pdf_bytes: bytes, pdf_filename: str = "livro_pet.pdf"
     ) -> bool:
@@ -102,10 +856,10 @@ class EmailService:
             if not self.enabled:
                 # Simulate sending (log only)
                 logger.info(
-                    f"[SIMULATED] Would send email to {to_email} "
-                    f"with PDF ({len(pdf_bytes)} bytes) as {pdf_filename}"
+                    "[SIMULATED] Would send email to %s with PDF (%d bytes) as %s",
+                    to_email, len(pdf_bytes), pdf_filename,
                 )
-                logger.info(f"[SIMULATED] Subject: {subject}")
+                logger.info("[SIMULATED] Subject: %s", subject)
                 return True
             
             # Create multipart message
@@ -114,66 +868,31 @@ class EmailService:
             msg["To"] = to_email
             msg["Subject"] = subject
             
-            # Create HTML body
-            body_html = """
-            <html>
-                <body style="font-family: Arial, sans-serif; padding: 20px;">
-                    <h2>Seu livro de colorir PetStory está pronto! 🎨</h2>
-                    <p>Olá!</p>
-                    <p>Seu livro de colorir personalizado com seus pets foi gerado com sucesso.</p>
-                    <p>Você pode encontrar o PDF anexado neste email.</p>
-                    <p>Divirta-se colorindo! 🐾</p>
-                    <hr>
-                    <p style="color: #666; font-size: 12px;">
-                        PetStory - Transformando memórias em arte
-                    </p>
-                </body>
-            </html>
-            """
-            
             # Attach HTML body
-            msg.attach(MIMEText(body_html, "html", "utf-8"))
+            msg.attach(MIMEText(_PDF_BODY_HTML, "html", "utf-8"))
             
-            # Attach PDF
-            pdf_attachment = MIMEApplication(pdf_bytes, _subtype="pdf")
-            pdf_attachment.add_header(
-                "Content-Disposition",
-                "attachment",
-                filename=pdf_filename,
-            )
-            msg.attach(pdf_attachment)
+            # Attach PDF (body is streamed at send time)
+            msg.attach(_pdf_attachment_part(pdf_filename))
             
-            # Connect to SMTP server and send
+            # Send over a pooled, already authenticated SMTP connection
             try:
-                with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30) as server:
-                    # Enable debug (optional, can be removed in production)
-                    if settings.DEBUG:
-                        server.set_debuglevel(1)
-                    
-                    # Start TLS encryption
-                    server.starttls()
-                    
-                    # Login
-                    server.login(self.smtp_user, self.smtp_password)
-                    
-                    # Send email
-                    server.send_message(msg)
-                    
-                logger.info(f"Email sent successfully to {to_email}")
+                await asyncio.to_thread(self._send_message, msg, to_email, pdf_bytes)
+                
+                logger.info("Email sent successfully to %s", to_email)
                 return True
                 
             except smtplib.SMTPAuthenticationError as e:
-                logger.error(f"SMTP authentication failed: {str(e)}")
+                logger.error("SMTP authentication failed: %s", e)
                 return False
             except smtplib.SMTPException as e:
-                logger.error(f"SMTP error occurred: {str(e)}")
+                logger.error("SMTP error occurred: %s", e)
                 return False
             except Exception as e:
-                logger.error(f"Unexpected error sending email: {str(e)}", exc_info=True)
+                logger.error("Unexpected error sending email: %s", e, exc_info=True)
                 return False
             
         except Exception as e:
-            logger.error(f"Error sending email to {to_email}: {str(e)}", exc_info=True)
+            logger.error("Error sending email to %s: %s", to_email, e, exc_info=True)
             return False
     
     async def send_pet_story_email(
@@ -184,6 +903,7 @@ class EmailService:
         html_content: str,
         pdf_filename: str = "kit_digital.pdf",
         homenagem_url: Optional[str] = None,
+        pdf_base64: Optional[bytes] = None,
     ) -> bool:
         """Send pet story email with PDF attachment.
         
@@ -194,16 +914,48 @@ class EmailService:
             html_content: HTML content (not used, kept for backward compatibility)
             pdf_filename: Name for the PDF attachment
             homenagem_url: Optional URL to the tribute website for QR code
+            pdf_base64: Optional pre-encoded PDF, reused across retries
             
         Returns:
             True if sent successfully, False otherwise
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        email_logger.info("=" * 80)
-        email_logger.info(f"Attempting to send email to {to_email} for pet {pet_name}")
-        email_logger.info(f"Timestamp: {timestamp}")
+        sent, _ = await self._send_pet_story_email(
+            to_email=to_email,
+            pet_name=pet_name,
+            pdf_bytes=pdf_bytes,
+            html_content=html_content,
+            pdf_filename=pdf_filename,
+            homenagem_url=homenagem_url,
+            pdf_base64=pdf_base64,
+        )
+        return sent
+
+    async def _send_pet_story_email(
+        self,
+        to_email: str,
+        pet_name: str,
+        pdf_bytes: bytes,
+        html_content: str,
+        pdf_filename: str = "kit_digital.pdf",
+        homenagem_url: Optional[str] = None,
+        pdf_base64: Optional[bytes] = None,
+    ) -> Tuple[bool, bool]:
+        """Send pet story email with PDF attachment (see send_pet_story_email).
+        
+        Returns:
+            (sent, retryable): retryable is True only for failures that may
+            succeed later - dropped connections, timeouts and 4xx replies
+        """
+        email_logger.info("Attempting to send email to %s for pet %s", to_email, pet_name)
         
         try:
+            # Validate email address
+            if not to_email or "@" not in to_email:
+                error_msg = f"Invalid email address: {to_email}"
+                logger.error(error_msg)
+                email_logger.error(error_msg)
+                return False, False
+            
             if not self.enabled:
                 # Simulate sending (log only)
                 msg = (
@@ -213,20 +965,13 @@ class EmailService:
                 logger.warning(msg)
                 email_logger.warning(msg)
                 email_logger.warning("Email service is NOT enabled - check SMTP credentials in .env")
-                return False  # Return False instead of True to indicate failure
+                return False, False  # Return False instead of True to indicate failure
             
-            # Validate email address
-            if not to_email or "@" not in to_email:
-                error_msg = f"Invalid email address: {to_email}"
-                logger.error(error_msg)
-                email_logger.error(error_msg)
-                return False
-            
-            email_logger.info(f"SMTP Configuration: Server={self.smtp_server}, Port={self.smtp_port}")
-            email_logger.info(f"From: {self.from_name} <{self.from_email}>")
-            email_logger.info(f"To: {to_email}")
-            email_logger.info(f"PDF size: {len(pdf_bytes)} bytes")
-            email_logger.info(f"HTML content size: {len(html_content)} bytes")
+            email_logger.debug(
+                "SMTP %s:%s | From: %s <%s> | To: %s | PDF size: %d bytes | HTML content size: %d bytes",
+                self.smtp_server, self.smtp_port, self.from_name, self.from_email,
+                to_email, len(pdf_bytes), len(html_content),
+            )
             
             # Create multipart message
             msg = MIMEMultipart("mixed")
@@ -234,8 +979,6 @@ class EmailService:
             msg["To"] = to_email
             msg["Subject"] = f"O Kit Digital de {pet_name} está pronto! 🎨🐾"
             
-            email_logger.debug(f"Email subject: {msg['Subject']}")
-            
             # Generate QR code if URL provided
             qr_code_html = ""
             if homenagem_url:
@@ -244,162 +987,93 @@ class EmailService:
                     
                     qr_service = QRCodeService()
                     qr_base64 = qr_service.generate_qr_code_base64(homenagem_url, size=200)
-                    qr_code_html = f"""
-                    <div style="text-align: center; margin: 30px 0; padding: 20px; background-color: #f9fafb; border-radius: 10px;">
-                        <h3 style="color: #7c3aed; margin-bottom: 15px;">🌐 Acesse o Site de Homenagem</h3>
-                        <p style="color: #666; margin-bottom: 20px;">Escaneie o QR Code abaixo ou clique no link:</p>
-                        <img src="{qr_base64}" 
-                             alt="QR Code - Site de Homenagem" 
-                             style="width: 200px; height: 200px; margin: 20px auto; display: block; border: 3px solid #7c3aed; border-radius: 10px; padding: 10px; background-color: white;">
-                        <p style="margin-top: 20px;">
-                            <a href="{homenagem_url}" 
-                               style="color: #7c3aed; text-decoration: none; font-weight: bold; font-size: 14px;">
-                                {homenagem_url}
-                            </a>
-                        </p>
-                    </div>
-                    """
-                    email_logger.info(f"QR code generated for email: {homenagem_url}")
+                    qr_code_html = _QR_CODE_HTML_TEMPLATE.format(
+                        qr_base64=qr_base64, homenagem_url=homenagem_url
+                    )
+                    if email_logger.isEnabledFor(logging.DEBUG):
+                        email_logger.debug("QR code generated for email: %s", homenagem_url)
                 except Exception as e:
-                    logger.warning(f"Could not generate QR code for email: {e}")
-                    email_logger.warning(f"Could not generate QR code: {e}")
+                    logger.warning("Could not generate QR code for email: %s", e)
+                    email_logger.warning("Could not generate QR code: %s", e)
                     # Fallback: apenas link
-                    qr_code_html = f"""
-                    <div style="text-align: center; margin: 30px 0;">
-                        <p><a href="{homenagem_url}" style="color: #7c3aed;">Acesse o site de homenagem: {homenagem_url}</a></p>
-                    </div>
-                    """
+                    qr_code_html = _QR_LINK_FALLBACK_HTML_TEMPLATE.format(homenagem_url=homenagem_url)
             
             # Create HTML body
-            body_html = f"""
-            <html>
-                <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f5f5f5;">
-                    <div style="max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 10px;">
-                        <h2 style="color: #7c3aed;">🎉 O Kit Digital do {pet_name} está pronto!</h2>
-                        <p>Olá!</p>
-                        <p>Ficamos felizes em compartilhar que o kit digital personalizado do <strong>{pet_name}</strong> foi criado com sucesso!</p>
-                        <p>Você encontrará anexo:</p>
-                        <ul>
-                            <li><strong>PDF do Kit Digital</strong> - com capa, biografia, página para colorir e adesivos</li>
-                        </ul>
-                        {qr_code_html}
-                        <p>Divirta-se colorindo e compartilhando as memórias do {pet_name}! 🐾</p>
-                        <hr style="margin: 30px 0; border: none; border-top: 1px solid #e0e0e0;">
-                        <p style="color: #666; font-size: 12px; text-align: center;">
-                            PetStory - Transformando memórias em arte<br>
-                            Criado com ❤️ para você
-                        </p>
-                    </div>
-                </body>
-            </html>
-            """
+            body_html = _PET_STORY_HTML_TEMPLATE.format(pet_name=pet_name, qr_code_html=qr_code_html)
             
             # Attach HTML body
             msg.attach(MIMEText(body_html, "html", "utf-8"))
-            email_logger.debug("HTML body attached")
             
-            # Attach PDF
-            pdf_attachment = MIMEApplication(pdf_bytes, _subtype="pdf")
-            pdf_attachment.add_header(
-                "Content-Disposition",
-                "attachment",
-                filename=pdf_filename,
-            )
-            msg.attach(pdf_attachment)
-            email_logger.debug(f"PDF attachment added: {pdf_filename}")
+            # Attach PDF (body is streamed at send time)
+            msg.attach(_pdf_attachment_part(pdf_filename))
             
-            # Connect to SMTP server and send
+            # Send over a pooled, already authenticated SMTP connection
             try:
-                email_logger.info(f"Connecting to SMTP server {self.smtp_server}:{self.smtp_port}...")
-                with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30) as server:
-                    # Enable debug (optional, can be removed in production)
-                    if settings.DEBUG:
-                        server.set_debuglevel(1)
-                    
-                    # Start TLS encryption
-                    email_logger.debug("Starting TLS encryption...")
-                    server.starttls()
-                    email_logger.debug("TLS encryption started")
-                    
-                    # Login
-                    email_logger.debug(f"Attempting to login with user: {self.smtp_user}")
-                    server.login(self.smtp_user, self.smtp_password)
-                    email_logger.debug("Login successful")
-                    
-                    # Send email
-                    email_logger.info(f"Sending email message to {to_email}...")
-                    send_result = server.send_message(msg)
-                    email_logger.debug(f"SMTP send_message result: {send_result}")
-                    
-                    # Check if there were any rejected recipients
-                    if send_result:
-                        rejected = send_result.get(to_email, [])
-                        if rejected:
-                            error_msg = f"Email rejected by server. Recipients: {rejected}"
-                            email_logger.error(error_msg)
-                            logger.error(error_msg)
-                            return False
-                    
-                    email_logger.info(f"✓ Email sent successfully to {to_email}")
-                    logger.info(f"Pet story email sent successfully to {to_email}")
-                    email_logger.info("=" * 80)
-                    return True
+                # Send email (blocking socket I/O runs off the event loop)
+                send_result = await asyncio.to_thread(
+                    self._send_message, msg, to_email, pdf_bytes, pdf_base64
+                )
+                
+                # Check if there were any rejected recipients
+                if send_result:
+                    rejected = send_result.get(to_email, [])
+                    if rejected:
+                        error_msg = f"Email rejected by server. Recipients: {rejected}"
+                        email_logger.error(error_msg)
+                        logger.error(error_msg)
+                        return False, False
+                
+                email_logger.info("✓ Email sent successfully to %s", to_email)
+                logger.info("Pet story email sent successfully to %s", to_email)
+                return True, False
                 
             except smtplib.SMTPAuthenticationError as e:
                 error_msg = f"SMTP authentication failed: {str(e)}"
                 email_logger.error(error_msg)
-                email_logger.error(f"Check your SMTP_USER and SMTP_PASSWORD in .env file")
-                email_logger.error(f"For Gmail, you need to use an App Password, not your regular password")
+                email_logger.error("Check your SMTP_USER and SMTP_PASSWORD in .env file")
+                email_logger.error("For Gmail, you need to use an App Password, not your regular password")
                 logger.error(error_msg)
-                email_logger.info("=" * 80)
-                return False
+                return False, _is_transient_smtp_error(e)
             except smtplib.SMTPServerDisconnected as e:
                 error_msg = f"SMTP server disconnected: {str(e)}"
                 email_logger.error(error_msg)
-                email_logger.error(f"Server: {self.smtp_server}:{self.smtp_port}")
+                email_logger.error("Server: %s:%s", self.smtp_server, self.smtp_port)
                 logger.error(error_msg)
-                email_logger.info("=" * 80)
-                return False
+                return False, _is_transient_smtp_error(e)
             except smtplib.SMTPRecipientsRefused as e:
                 error_msg = f"SMTP recipients refused: {str(e)}"
                 email_logger.error(error_msg)
-                email_logger.error(f"Recipient {to_email} was refused by the server")
+                email_logger.error("Recipient %s was refused by the server", to_email)
                 logger.error(error_msg)
-                email_logger.info("=" * 80)
-                return False
+                return False, _is_transient_smtp_error(e)
             except smtplib.SMTPDataError as e:
                 error_msg = f"SMTP data error: {str(e)}"
                 email_logger.error(error_msg)
                 email_logger.error("The server refused the message data")
                 logger.error(error_msg)
-                email_logger.info("=" * 80)
-                return False
+                return False, _is_transient_smtp_error(e)
             except smtplib.SMTPException as e:
                 error_msg = f"SMTP error occurred: {str(e)}"
                 email_logger.error(error_msg)
-                email_logger.error(f"SMTP Error Code: {e.smtp_code if hasattr(e, 'smtp_code') else 'N/A'}")
-                email_logger.error(f"SMTP Error Message: {e.smtp_error if hasattr(e, 'smtp_error') else 'N/A'}")
+                email_logger.error("SMTP Error Code: %s", getattr(e, 'smtp_code', 'N/A'))
+                email_logger.error("SMTP Error Message: %s", getattr(e, 'smtp_error', 'N/A'))
                 logger.error(error_msg)
-                email_logger.info("=" * 80)
-                return False
+                return False, _is_transient_smtp_error(e)
             except TimeoutError as e:
                 error_msg = f"Timeout connecting to SMTP server: {str(e)}"
                 email_logger.error(error_msg)
-                email_logger.error(f"Server: {self.smtp_server}:{self.smtp_port}")
+                email_logger.error("Server: %s:%s", self.smtp_server, self.smtp_port)
                 logger.error(error_msg)
-                email_logger.info("=" * 80)
-                return False
+                return False, _is_transient_smtp_error(e)
             except Exception as e:
                 error_msg = f"Unexpected error sending email: {str(e)}"
                 email_logger.error(error_msg, exc_info=True)
                 logger.error(error_msg, exc_info=True)
-                email_logger.info("=" * 80)
-                return False
+                return False, _is_transient_smtp_error(e)
             
         except Exception as e:
             error_msg = f"Error sending pet story email to {to_email}: {str(e)}"
             email_logger.error(error_msg, exc_info=True)
             logger.error(error_msg, exc_info=True)
-            email_logger.info("=" * 80)
-            return False
+            return False, _is_transient_smtp_error(e)
 
@@ -0,0 +1,219 @@
+"""Content-addressed cache for Gemini image generation results."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Entries and total PNG bytes kept in the in-memory layer (most recently used last)
+MEMORY_CACHE_MAX_ENTRIES = 256
+MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# The disk layer is pruned to its size budget on the first write and every N writes after
+DISK_PRUNE_EVERY_PUTS = 32
+
+
+@lru_cache(maxsize=32)
+def _key_prefix(model_name: str, prompt: str) -> "hashlib._Hash":
+    """Return a SHA-256 state that has already consumed model and prompt.
+
+    Callers must copy() it before updating.
+    """
+    return hashlib.sha256(model_name.encode("utf-8") + b"\0" + prompt.encode("utf-8") + b"\0")
+
+
+class GeminiCache:
+    """Two-level (memory + disk) cache of generated PNGs.
+
+    Keys are derived from the input image, the prompt and the model name, so
+    resubmitted photos and retries skip the (slow, paid) API call.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_entries: int = MEMORY_CACHE_MAX_ENTRIES,
+        max_memory_bytes: int = MEMORY_CACHE_MAX_BYTES,
+        max_disk_bytes: int = 0,
+    ):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory for cached files. If None or empty, only memory is used.
+            max_memory_entries: Maximum entries kept in memory
+            max_memory_bytes: Maximum total size of the entries kept in memory
+            max_disk_bytes: Size budget for cache_dir; least recently used files
+                are deleted above it (0 = unlimited)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(image_bytes: bytes, prompt: str, model_name: str) -> str:
+        """Build the cache key for a generation request.
+
+        Args:
+            image_bytes: Input image bytes
+            prompt: Text prompt
+            model_name: Gemini model name
+
+        Returns:
+            SHA-256 hex digest of model, prompt and image
+        """
+        # Continue from the pre-hashed model + prompt prefix (the prompts are long)
+        digest = _key_prefix(model_name, prompt).copy()
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        """Return the on-disk path for a key (sharded by the first two hex chars)."""
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """Store an entry in the memory layer, evicting the least recently used."""
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory and (
+                len(self._memory) > self.max_memory_entries or self._memory_bytes > self.max_memory_bytes
+            ):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Look up a cached result.
+
+        Args:
+            key: Cache key (see make_key)
+
+        Returns:
+            Cached PNG bytes, or None on a miss
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Could not read Gemini cache entry %s: %s", key, e)
+            return None
+        if self.max_disk_bytes:
+            # Pruning drops the oldest mtimes first - mark this entry as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store a result in memory and on disk.
+
+        Disk errors are logged and otherwise ignored - the cache is best effort.
+
+        Args:
+            key: Cache key (see make_key)
+            data: PNG bytes to cache
+        """
+        self._remember(key, data)
+        if self.cache_dir is None:
+            return
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename so readers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("Could not write Gemini cache entry %s: %s", key, e)
+            return
+
+        with self._lock:
+            prune = self.max_disk_bytes and self._puts % DISK_PRUNE_EVERY_PUTS == 0
+            self._puts += 1
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Delete the least recently used files until cache_dir fits max_disk_bytes.
+
+        Returns:
+            Number of files deleted
+        """
+        if self.cache_dir is None or not self.max_disk_bytes:
+            return 0
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_disk_bytes:
+            return 0
+
+        deleted = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning("Could not delete Gemini cache file %s: %s", path, e)
+                continue
+            total -= size
+            deleted += 1
+        logger.info("Pruned %d Gemini cache file(s), %d bytes left", deleted, total)
+        return deleted
+
+
+@lru_cache(maxsize=1)
+def get_gemini_cache() -> Optional[GeminiCache]:
+    """Return the shared GeminiCache configured from settings.
+
+    Returns:
+        GeminiCache, or None if GEMINI_CACHE_ENABLED is off
+    """
+    if not settings.GEMINI_CACHE_ENABLED:
+        return None
+    return GeminiCache(
+        cache_dir=settings.GEMINI_CACHE_DIR,
+        max_disk_bytes=settings.GEMINI_CACHE_MAX_DISK_MB * 1024 * 1024,
+    )
@@ -1,114 +1,314 @@
 """Gemini Image Generation implementation using the new API."""
 
-import base64
+import asyncio
+import inspect
 import io
+import itertools
 import logging
 import os
-from datetime import datetime
-from typing import Optional
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, TypeVar, Union
 
+import anyio
 import google.generativeai as genai
-from PIL import Image
+from google.generativeai import client as genai_client
+from google.api_core import exceptions as google_exceptions
+from PIL import Image, ImageOps
 
 from app.core.config import settings
+from app.services.gemini_cache import GeminiCache, get_gemini_cache
+from app.services.prompts import BOBBIE_GOODS_PROMPT, STICKER_PROMPT
+from app.utils.image import PNG_HEADER_SIZE, SNIFF_HEADER_SIZE, is_rgb_png, sniff_image_type
+from app.utils.retry import aretry
 
 logger = logging.getLogger(__name__)
 
-# Export prompts for use in other modules
-__all__ = ["BOBBIE_GOODS_PROMPT", "STICKER_PROMPT", "GeminiGenerator"]
-
-# System Prompt para estilo Bobbie Goods
-# BOBBIE_GOODS_PROMPT = (
-#     "Create a vector-style coloring book page of this pet, reimagined as a 'Bobbie Goods' character. "
-#     "Do NOT trace the photo realistically. Instead, caricature the pet to look extra chubby and soft. "
-#     "MANDATORY STYLE RULES: "
-#     "1. BODY SHAPE: Make the pet look round, squishy, and potato-shaped. Shorten the legs to be cute and stubby. "
-#     "2. FACE: Ignore realistic eyes. Use widely spaced, small black dots for eyes (kawaii style). Small, simple nose. "
-#     "3. LINE WORK: Use extremely thick, mono-weight, bold black lines (like a thick Sharpie marker). "
-#     "4. PAWS: Simplify paws into rounded 'nubs' or simple shapes. No realistic claws or toes. "
-#     "5. DECORATION: Add small floating sparkles, stars, or hearts around the pet to fill empty space. "
-#     "6. TECH SPECS: Pure white background. STRICTLY NO SHADING, NO GRAYSCALE, NO TEXTURE."
-# )
-
-BOBBIE_GOODS_PROMPT = (
-    "Convert this pet photo into a clean, realistic line art illustration suitable for a coloring book.\n\n"
-
-    "CORE GOAL:\n"
-    "- Preserve the pet's REAL appearance, proportions, and expression.\n"
-    "- The pet must remain clearly recognizable to its owner.\n\n"
-
-    "STYLE RULES:\n"
-    "- Create a black-and-white outline drawing (line art).\n"
-    "- Follow the natural contours of the pet from the photo.\n"
-    "- Use smooth, confident, continuous black lines.\n\n"
-
-    "LINE WORK:\n"
-    "- Medium-to-thick clean outlines.\n"
-    "- No sketchy lines.\n"
-    "- No cross-hatching.\n"
-    "- No shading, no gradients, no gray tones.\n\n"
-
-    "DETAIL CONTROL:\n"
-    "- Simplify fur into clean contour shapes.\n"
-    "- Keep facial features accurate but simplified.\n"
-    "- Eyes, nose, and mouth should reflect the real pet.\n\n"
-
-    "COLORING BOOK REQUIREMENTS:\n"
-    "- Pure white background.\n"
-    "- Black lines only.\n"
-    "- Large enclosed areas suitable for coloring.\n\n"
-
-    "COMPOSITION:\n"
-    "- Center the pet.\n"
-    "- Remove background elements completely.\n\n"
-
-    "FINAL OUTPUT:\n"
-    "- Clean, printable coloring book page.\n"
-    "- No artistic style exaggeration.\n"
-)
+# Prompts live in app.services.prompts; re-exported for existing importers
+__all__ = ["BOBBIE_GOODS_PROMPT", "STICKER_PROMPT", "GeminiGenerator", "run_sync"]
+
+T = TypeVar("T")
+
+# Default number of Gemini calls a batch keeps in flight at once
+GEMINI_BATCH_CONCURRENCY = 8
+
+# JPEG quality for photos downscaled to settings.GEMINI_MAX_INPUT_EDGE before upload
+GEMINI_INPUT_JPEG_QUALITY = 92
 
-# Prompt específico para adesivos (stickers), inspirado em cartelas coloridas com contorno branco
-STICKER_PROMPT = (
-    "Create a colorful sticker sheet style illustration of this pet, similar to kawaii pet sticker sheets.\n\n"
-
-    "OVERALL STYLE (VERY IMPORTANT):\n"
-    "- Cute, cartoon / kawaii style.\n"
-    "- Use flat, vibrant colors (no gradients, no complex shading).\n"
-    "- Strong black outline around the drawing.\n"
-    "- Add a THICK WHITE BORDER around the entire sticker shape (die-cut sticker style).\n"
-    "- The sticker must look like it was cut out from a sticker sheet.\n\n"
-
-    "PET DESIGN:\n"
-    "- The pet must be clearly recognizable from the photo.\n"
-    "- Slightly exaggerate cuteness: bigger head, bigger eyes, softer body shapes.\n"
-    "- Keep main colors of the real pet (fur color, spots, etc.).\n"
-    "- Use clean, simple shapes and minimal details so it works at small size.\n\n"
-
-    "DECORATIVE ELEMENTS:\n"
-    "- Around or near the pet, you MAY add small extra icons:\n"
-    "  hearts, paw prints, bones, fish, food bowls, toys, etc.\n"
-    "- These icons should also have black outline and thick white border.\n"
-    "- Do NOT add text inside the sticker.\n\n"
-
-    "COMPOSITION:\n"
-    "- Center the pet.\n"
-    "- Leave enough empty space around the pet for the white border.\n"
-    "- Avoid cropping ears or tail: the full pet must fit inside the sticker.\n\n"
-
-    "BACKGROUND:\n"
-    "- Use a pure white background behind the sticker (so it blends with the page).\n"
-    "- The sticker itself must be visually separated by the thick white border.\n\n"
-
-    "TECHNICAL:\n"
-    "- High resolution, sharp lines.\n"
-    "- High contrast outlines so the shape is clear when printed small (2–3 cm).\n"
-    "- No photographic textures. 100% illustrated look.\n\n"
-
-    "FINAL OUTPUT:\n"
-    "- A single sticker-style illustration of the pet, ready to be printed on a sticker sheet.\n"
+# Retries for rate limiting (429), overloaded/failed backends (5xx) and timeouts
+GEMINI_MAX_ATTEMPTS = 4
+GEMINI_RETRY_BASE_DELAY = 0.5
+GEMINI_RETRY_MAX_DELAY = 8.0
+_TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
 )
 
 
+class _AsyncRateLimiter:
+    """Token bucket allowing `rate` acquisitions per `period` seconds.
+    
+    Waiters are served in order; a rate of 0 disables the limit.
+    """
+    
+    def __init__(self, rate: float, period: float = 60.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                refill = (now - self._updated) * self.rate / self.period
+                self._tokens = min(float(self.rate), self._tokens + refill)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+
+_fallback_loop: Optional[asyncio.AbstractEventLoop] = None
+_FALLBACK_LOOP_LOCK = threading.Lock()
+
+
+def _get_fallback_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop run_sync uses outside the app, starting it on first use.
+    
+    The async gRPC client is bound to the loop it was first used on, so all
+    calls must share one long-lived loop rather than a fresh one per call.
+    """
+    global _fallback_loop
+    with _FALLBACK_LOOP_LOCK:
+        if _fallback_loop is None:
+            loop = asyncio.new_event_loop()
+            # Daemon thread: it never blocks interpreter shutdown
+            threading.Thread(target=loop.run_forever, name="gemini-run-sync", daemon=True).start()
+            _fallback_loop = loop
+        return _fallback_loop
+
+
+def run_sync(async_fn: Callable[..., Awaitable[T]], *args: Any) -> T:
+    """Run a GeminiGenerator coroutine method from synchronous code.
+    
+    From a sync BackgroundTask (an AnyIO worker thread) the call is sent back to
+    the app's event loop, where the shared async client lives. Elsewhere (e.g.
+    scripts) it runs on a long-lived background event loop shared by all calls.
+    
+    Args:
+        async_fn: Coroutine function, e.g. ``generator.generate_art``
+        *args: Positional arguments for async_fn
+        
+    Returns:
+        The coroutine's result
+    """
+    try:
+        return anyio.from_thread.run(async_fn, *args)
+    except anyio.NoEventLoopError:
+        future = asyncio.run_coroutine_threadsafe(async_fn(*args), _get_fallback_loop())
+        return future.result()
+
+
+# Output directories already created by this process
+_MADE_DIRS: Set[str] = set()
+_DIRS_LOCK = threading.Lock()
+_STAMP_COUNTER = itertools.count()
+
+# API key genai was last configured with. genai.configure() is global and drops
+# the SDK's cached clients (and their connections), so it only runs on a change.
+_configured_api_key: Optional[str] = None
+_CONFIGURE_LOCK = threading.Lock()
+
+
+def _configure_genai(api_key: str) -> None:
+    """Configure the genai SDK unless it already uses this API key."""
+    global _configured_api_key
+    with _CONFIGURE_LOCK:
+        if _configured_api_key == api_key:
+            return
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+
+
+def _ensure_dir(path: str) -> None:
+    """Create a directory once per process (later calls are a set lookup)."""
+    if path in _MADE_DIRS:
+        return
+    with _DIRS_LOCK:
+        if path not in _MADE_DIRS:
+            os.makedirs(path, exist_ok=True)
+            _MADE_DIRS.add(path)
+
+
+async def _aensure_dir(path: str) -> None:
+    """Async _ensure_dir: only the first call per directory touches the disk (in a thread)."""
+    if path not in _MADE_DIRS:
+        await asyncio.to_thread(_ensure_dir, path)
+
+
+def _next_stamp() -> str:
+    """Return a unique, increasing stamp for output filenames."""
+    return f"{time.time_ns()}_{os.getpid()}_{next(_STAMP_COUNTER)}"
+
+
+def _read_bytes(path: str) -> bytes:
+    """Read a whole file with raw os calls (no buffered file object)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            # Ask for the remaining size (at least 64 KiB) until EOF
+            chunk = os.read(fd, max(size, 65536))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    """Write data to path with raw os calls (no buffered file object)."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+
+def _shrink_input_image(image_bytes: bytes, max_edge: int) -> Optional[bytes]:
+    """Downscale a photo whose long edge exceeds max_edge.
+    
+    Only the header is read for photos that are already small enough.
+    
+    Args:
+        image_bytes: Input image bytes
+        max_edge: Longest edge to keep, in pixels
+        
+    Returns:
+        JPEG bytes of the resized photo, or None if no resize is needed
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        if max(image.size) <= max_edge:
+            return None
+        
+        # JPEG: let libjpeg decode at a reduced scale (still >= the target size)
+        image.draft("RGB", (max_edge, max_edge))
+        # Apply the EXIF rotation before it is lost in the re-encode
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        
+        output_buffer = io.BytesIO()
+        image.save(output_buffer, format="JPEG", quality=GEMINI_INPUT_JPEG_QUALITY)
+        return output_buffer.getvalue()
+
+
+def _encode_rgb_png(image_bytes: bytes) -> bytes:
+    """Decode an image and re-encode it as an RGB PNG.
+    
+    Uses fast compression: the output is printed, not served, so size
+    matters less than encode time.
+    
+    Args:
+        image_bytes: Image bytes in any format Pillow reads
+        
+    Returns:
+        PNG bytes
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        
+        output_buffer = io.BytesIO()
+        image.save(output_buffer, format="PNG", compress_level=1)
+        return output_buffer.getvalue()
+
+
+def _extract_image_bytes(response: Any) -> bytes:
+    """Return the first inline image in a generate_content response.
+    
+    Args:
+        response: Response from generate_content / generate_content_async
+        
+    Returns:
+        Image bytes of the first inline_data part
+        
+    Raises:
+        ValueError: If the response has no image (text-only answers are
+            refusals, e.g. safety, and their text is included in the message)
+    """
+    if not response.candidates:
+        raise ValueError("No image generated in response")
+    
+    # Work on the raw protobuf message: field access is direct, without
+    # the proto-plus wrappers built on every attribute access
+    candidate = response.candidates[0]
+    parts = type(candidate).pb(candidate).content.parts
+    if not parts:
+        raise ValueError("No image generated in response")
+    
+    # According to documentation: https://ai.google.dev/gemini-api/docs/image-generation
+    # Single pass, dispatching on the protobuf oneof; the first image wins
+    kinds = []
+    for part in parts:
+        kind = part.WhichOneof("data")
+        if kind == "inline_data":
+            return part.inline_data.data
+        kinds.append(kind)
+    
+    if all(kind == "text" for kind in kinds):
+        texts = " ".join(part.text for part in parts).strip()
+        raise ValueError(f"Gemini returned no image: {texts[:500]}")
+    logger.debug("No image in response; part kinds: %s", kinds)
+    raise ValueError("No image data found in response parts")
+
+
+@lru_cache(maxsize=16)
+def _prompt_part(prompt: str) -> "genai.protos.Part":
+    """Return the request Part for a prompt, built once per distinct prompt.
+    
+    The art and sticker prompts are long static strings sent on every call.
+    """
+    return genai.protos.Part(text=prompt)
+
+
+async def _gather_bounded(
+    aws: Iterable[Awaitable[T]], concurrency: int
+) -> List[Union[T, BaseException]]:
+    """Await all awaitables with at most `concurrency` running at once.
+    
+    Args:
+        aws: Awaitables to run (coroutines are only started once a slot is free)
+        concurrency: Maximum number running at the same time
+        
+    Returns:
+        Results in input order; failures are returned as exception instances
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _one(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+    
+    return await asyncio.gather(*(_one(aw) for aw in aws), return_exceptions=True)
+
+
 class GeminiGenerator:
     """Gemini Image Generation implementation of ImageGenerator.
     
@@ -116,18 +316,115 @@ class GeminiGenerator:
     See: https://ai.google.dev/gemini-api/docs/image-generation
     """
 
-    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        cache: Optional[GeminiCache] = None,
+    ):
         """Initialize Gemini client.
         
         Args:
             api_key: Gemini API key. If None, uses settings.GEMINI_API_KEY
             model_name: Model name. If None, uses settings.GEMINI_IMAGE_MODEL
+            cache: Response cache. If None, uses the shared cache from settings
+                (which is None itself when GEMINI_CACHE_ENABLED is off)
         """
         self.api_key = api_key or settings.GEMINI_API_KEY
-        genai.configure(api_key=self.api_key)
+        # The default transports are gRPC (sync) and gRPC asyncio (async): each keeps
+        # one long-lived HTTP/2 channel, so every request reuses the same connection
+        _configure_genai(self.api_key)
         self.model_name = model_name or settings.GEMINI_IMAGE_MODEL
         self.model = genai.GenerativeModel(self.model_name)
-
+        # API clients this generator created for its model (closed by aclose)
+        self._owned_clients: Dict[str, Any] = {}
+        self.cache = cache if cache is not None else get_gemini_cache()
+        # Larger photos are downscaled before upload (0 sends them as they are)
+        self.max_input_edge = settings.GEMINI_MAX_INPUT_EDGE
+        # Bound in-flight calls and pace them under the provider's RPM quota
+        # (created on first use, from the event loop that makes the calls)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional[_AsyncRateLimiter] = None
+        # cache key -> task generating it, so concurrent duplicates share one call
+        self._inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+
+    async def __aenter__(self) -> "GeminiGenerator":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+    
+    def _own_client(self, attr: str, name: str) -> None:
+        """Give the model its own API client instead of the SDK's shared default.
+        
+        GenerativeModel falls back to process-wide cached clients that every
+        model shares, so closing those would break other generators. The async
+        client is created on first use, from the event loop that makes the calls.
+        
+        Args:
+            attr: Model attribute holding the client ("_client" or "_async_client")
+            name: SDK client name ("generative" or "generative_async")
+        """
+        if getattr(self.model, attr, None) is None:
+            api_client = genai_client._client_manager.make_client(name)
+            setattr(self.model, attr, api_client)
+            self._owned_clients[attr] = api_client
+    
+    async def aclose(self) -> None:
+        """Close the connections held by the API clients this generator created."""
+        while self._owned_clients:
+            attr, api_client = self._owned_clients.popitem()
+            # Detach first; a later call creates a fresh client
+            setattr(self.model, attr, None)
+            try:
+                result = api_client.transport.close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning("Error closing Gemini client: %s", e)
+    
+    async def _generate_content(self, contents: list) -> Any:
+        """Call the API, retrying transient failures (429/5xx/timeouts).
+        
+        At most GEMINI_MAX_CONCURRENCY calls are in flight, paced to GEMINI_RPM.
+        Retries use exponential backoff with jitter, capped at
+        GEMINI_RETRY_MAX_DELAY seconds, for up to GEMINI_MAX_ATTEMPTS attempts.
+        
+        Args:
+            contents: Request contents (prompt part + image)
+            
+        Returns:
+            The SDK response
+            
+        Raises:
+            google.api_core.exceptions.GoogleAPIError: If the last attempt fails
+                or the error is not transient
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+            self._rate_limiter = _AsyncRateLimiter(settings.GEMINI_RPM, 60.0)
+        
+        self._own_client("_async_client", "generative_async")
+        
+        async def _attempt() -> Any:
+            async with self._semaphore:
+                await self._rate_limiter.acquire()
+                return await self.model.generate_content_async(
+                    contents,
+                    generation_config={
+                        "temperature": 0.4,
+                    },
+                )
+        
+        return await aretry(
+            _attempt,
+            retries=GEMINI_MAX_ATTEMPTS - 1,
+            base=GEMINI_RETRY_BASE_DELAY,
+            cap=GEMINI_RETRY_MAX_DELAY,
+            exceptions=_TRANSIENT_ERRORS,
+            description="Gemini generate_content",
+        )
+    
     async def generate(self, image_bytes: bytes, prompt: str) -> bytes:
         """Generate a coloring book style image from input photo.
         
@@ -141,138 +438,154 @@ class GeminiGenerator:
         Raises:
             Exception: If generation fails
         """
-        try:
-            # Load image from bytes
-            input_image = Image.open(io.BytesIO(image_bytes))
+        cache_key = GeminiCache.make_key(image_bytes, prompt, self.model_name)
+        
+        # Same photo + prompt + model was generated before: skip the API call
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.debug("Gemini cache hit bytes=%d", len(cached))
+                return cached
+        
+        # Same request already in flight: wait for its result instead of calling again
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate_uncached(image_bytes, prompt, cache_key))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        else:
+            logger.debug("Joining in-flight Gemini request")
+        # Shielded: a cancelled caller must not cancel the call others are waiting on
+        return await asyncio.shield(task)
+    
+    async def _generate_uncached(self, image_bytes: bytes, prompt: str, cache_key: str) -> bytes:
+        """Call Gemini for one image and cache the result (see generate).
+        
+        Args:
+            image_bytes: Input image as bytes
+            prompt: Text prompt for transformation
+            cache_key: Cache key for this request (see GeminiCache.make_key)
             
-            # Convert to RGB if necessary (remove alpha channel)
-            if input_image.mode != "RGB":
-                input_image = input_image.convert("RGB")
+        Returns:
+            Generated image as PNG bytes
+        """
+        started = time.perf_counter()
+        try:
+            mime_type = sniff_image_type(image_bytes[:SNIFF_HEADER_SIZE])
+            # Decoding/resizing a large photo is CPU work: keep it off the event loop
+            shrunk_bytes = None
+            if self.max_input_edge > 0:
+                shrunk_bytes = await asyncio.to_thread(_shrink_input_image, image_bytes, self.max_input_edge)
+            if shrunk_bytes is not None:
+                # Oversized photo: send the smaller JPEG re-encode instead
+                input_image = {"mime_type": "image/jpeg", "data": shrunk_bytes}
+            elif mime_type is not None:
+                # Formats Gemini accepts are sent as is (no decode + SDK re-encode)
+                input_image = {"mime_type": mime_type, "data": image_bytes}
+            else:
+                # Anything else: decode with PIL and let the SDK encode it
+                input_image = Image.open(io.BytesIO(image_bytes))
+                
+                # Convert to RGB if necessary (remove alpha channel)
+                if input_image.mode != "RGB":
+                    input_image = input_image.convert("RGB")
             
             # Generate image using Gemini
             # The API supports image-to-image transformation
-            response = self.model.generate_content(
-                [prompt, input_image],
-                generation_config={
-                    "temperature": 0.4,
-                },
+            response = await self._generate_content([_prompt_part(prompt), input_image])
+            
+            generated_bytes = _extract_image_bytes(response)
+            
+            passthrough = is_rgb_png(generated_bytes[:PNG_HEADER_SIZE])
+            if passthrough:
+                # Already an RGB PNG (checked from the IHDR bytes): return it as is
+                output_bytes = generated_bytes
+            else:
+                output_bytes = await asyncio.to_thread(_encode_rgb_png, generated_bytes)
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, cache_key, output_bytes)
+            
+            # One event per generation, formatted only if the level is enabled
+            logger.info(
+                "Gemini image generated model=%s input_bytes=%d output_bytes=%d passthrough=%s duration_ms=%d",
+                self.model_name, len(image_bytes), len(output_bytes), passthrough,
+                (time.perf_counter() - started) * 1000,
             )
-            
-            # Extract generated image from response
-            if not response.candidates or not response.candidates[0].content.parts:
-                raise ValueError("No image generated in response")
-            
-            # The response contains parts, and one of them should be the generated image
-            # According to documentation: https://ai.google.dev/gemini-api/docs/image-generation
-            generated_image = None
-            for part in response.candidates[0].content.parts:
-                # Method 1: Check if part has text (shouldn't happen for image generation, but log it)
-                if hasattr(part, 'text') and part.text:
-                    logger.debug(f"Response part contains text: {part.text[:100]}")
-                
-                # Method 2: Check if part has inline_data
-                if hasattr(part, 'inline_data') and part.inline_data:
-                    try:
-                        inline_data = part.inline_data
-                        mime_type = getattr(inline_data, 'mime_type', 'N/A')
-                        logger.info(f"Found inline_data: mime_type={mime_type}")
-                        
-                        # Try to get data - it might be bytes or base64 string
-                        data = inline_data.data
-                        logger.info(f"Data type: {type(data)}, length: {len(data) if hasattr(data, '__len__') else 'N/A'}")
-                        
-                        # If data is a string, try to decode as base64
-                        if isinstance(data, str):
-                            logger.debug("Data is string, decoding as base64")
-                            image_data = base64.b64decode(data)
-                        # If data is bytes, use directly
-                        elif isinstance(data, bytes):
-                            logger.debug("Data is bytes, using directly")
-                            image_data = data
-                        else:
-                            # Try to convert to bytes
-                            logger.debug(f"Converting data to bytes from type {type(data)}")
-                            image_data = bytes(data)
-                        
-                        logger.info(f"Image data length: {len(image_data)} bytes")
-                        
-                        # Try to open as image
-                        generated_image = Image.open(io.BytesIO(image_data))
-                        logger.info("Successfully extracted image from inline_data")
-                        break
-                    except Exception as e:
-                        logger.error(f"Failed to decode inline_data: {e}", exc_info=True)
-                        # Try to save raw data for inspection
-                        try:
-                            if 'image_data' in locals():
-                                with open('/tmp/gemini_raw_data.bin', 'wb') as f:
-                                    f.write(image_data)
-                                logger.error(f"Saved raw data to /tmp/gemini_raw_data.bin for inspection")
-                        except:
-                            pass
-                        continue
-                
-                # Method 3: Check if part has file_data
-                if hasattr(part, 'file_data') and part.file_data:
-                    try:
-                        file_data = part.file_data
-                        logger.debug(f"Found file_data: mime_type={getattr(file_data, 'mime_type', 'N/A')}")
-                        # Similar processing as inline_data
-                        data = file_data.data
-                        if isinstance(data, str):
-                            image_data = base64.b64decode(data)
-                        elif isinstance(data, bytes):
-                            image_data = data
-                        else:
-                            image_data = bytes(data)
-                        generated_image = Image.open(io.BytesIO(image_data))
-                        logger.info("Successfully extracted image from file_data")
-                        break
-                    except Exception as e:
-                        logger.warning(f"Failed to decode file_data: {e}")
-                        continue
-                
-                # Method 4: Check if part has as_image method (PIL Image)
-                if hasattr(part, 'as_image'):
-                    try:
-                        generated_image = part.as_image()
-                        logger.info("Extracted image using as_image() method")
-                        break
-                    except Exception as e:
-                        logger.debug(f"as_image() method failed: {e}")
-                        continue
-            
-            if generated_image is None:
-                # Log detailed information for debugging
-                logger.error("No image data found. Response details:")
-                logger.error(f"Number of candidates: {len(response.candidates)}")
-                for i, part in enumerate(response.candidates[0].content.parts):
-                    logger.error(f"Part {i}:")
-                    logger.error(f"  Type: {type(part)}")
-                    logger.error(f"  Has text: {hasattr(part, 'text') and bool(part.text)}")
-                    logger.error(f"  Has inline_data: {hasattr(part, 'inline_data') and bool(part.inline_data)}")
-                    if hasattr(part, 'inline_data') and part.inline_data:
-                        logger.error(f"  inline_data type: {type(part.inline_data)}")
-                        logger.error(f"  inline_data attributes: {dir(part.inline_data)}")
-                    logger.error(f"  Has file_data: {hasattr(part, 'file_data') and bool(part.file_data)}")
-                raise ValueError("No image data found in response parts")
-            
-            # Convert to RGB and save as PNG bytes
-            if generated_image.mode != "RGB":
-                generated_image = generated_image.convert("RGB")
-            
-            output_buffer = io.BytesIO()
-            generated_image.save(output_buffer, format="PNG")
-            output_bytes = output_buffer.getvalue()
-            
-            logger.info(f"Successfully generated image ({len(output_bytes)} bytes)")
             return output_bytes
             
         except Exception as e:
-            logger.error(f"Error generating image with Gemini: {str(e)}", exc_info=True)
+            # The only place the traceback is logged; callers just add context
+            logger.error(
+                "Gemini image generation failed model=%s input_bytes=%d duration_ms=%d error=%s",
+                self.model_name, len(image_bytes), (time.perf_counter() - started) * 1000, e,
+                exc_info=True,
+            )
             raise
     
-    def generate_art(self, photo_path: str, output_dir: Optional[str] = None) -> str:
+    async def generate_batch(
+        self,
+        image_bytes_list: List[bytes],
+        prompt: str,
+        concurrency: int = GEMINI_BATCH_CONCURRENCY,
+    ) -> List[Union[bytes, BaseException]]:
+        """Generate images for several photos concurrently.
+        
+        Args:
+            image_bytes_list: Input images as bytes
+            prompt: Text prompt applied to every image
+            concurrency: Maximum number of API calls in flight
+            
+        Returns:
+            PNG bytes per input (same order); failed items hold the exception
+        """
+        return await _gather_bounded(
+            (self.generate(image_bytes, prompt) for image_bytes in image_bytes_list),
+            concurrency,
+        )
+    
+    async def generate_arts(
+        self,
+        photo_paths: List[str],
+        output_dir: Optional[str] = None,
+        concurrency: int = GEMINI_BATCH_CONCURRENCY,
+    ) -> List[Union[str, BaseException]]:
+        """Generate art for several photo files concurrently (see generate_art).
+        
+        Args:
+            photo_paths: Paths to the input pet photos
+            output_dir: Directory to save the generated art. If None, saves next to each photo.
+            concurrency: Maximum number of API calls in flight
+            
+        Returns:
+            Output path per photo (same order); failed items hold the exception
+        """
+        return await _gather_bounded(
+            (self.generate_art(photo_path, output_dir) for photo_path in photo_paths),
+            concurrency,
+        )
+    
+    async def generate_stickers(
+        self,
+        photo_paths: List[str],
+        output_dir: Optional[str] = None,
+        concurrency: int = GEMINI_BATCH_CONCURRENCY,
+    ) -> List[Union[str, BaseException]]:
+        """Generate stickers for several photo files concurrently (see generate_sticker).
+        
+        Args:
+            photo_paths: Paths to the input pet photos
+            output_dir: Directory to save the generated stickers. If None, saves next to each photo.
+            concurrency: Maximum number of API calls in flight
+            
+        Returns:
+            Output path per photo (same order); failed items hold the exception
+        """
+        return await _gather_bounded(
+            (self.generate_sticker(photo_path, output_dir) for photo_path in photo_paths),
+            concurrency,
+        )
+    
+    async def generate_art(self, photo_path: str, output_dir: Optional[str] = None) -> str:
         """Generate art from a pet photo file and save to disk.
         
         Args:
@@ -286,46 +599,33 @@ class GeminiGenerator:
             Exception: If generation fails
         """
         try:
-            # Read photo from file
-            with open(photo_path, "rb") as f:
-                photo_bytes = f.read()
+            # Read photo from file (off the event loop)
+            photo_bytes = await asyncio.to_thread(_read_bytes, photo_path)
             
-            logger.info(f"Generating art from photo: {photo_path}")
+            logger.debug("Generating art from photo: %s", photo_path)
             
-            # Generate art using the async method (sync wrapper)
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            art_bytes = loop.run_until_complete(
-                self.generate(photo_bytes, BOBBIE_GOODS_PROMPT)
-            )
+            art_bytes = await self.generate(photo_bytes, BOBBIE_GOODS_PROMPT)
             
             # Determine output path
             if output_dir is None:
                 output_dir = os.path.dirname(photo_path)
             
-            os.makedirs(output_dir, exist_ok=True)
+            await _aensure_dir(output_dir)
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"arte_{timestamp}.png"
+            output_filename = f"arte_{_next_stamp()}.png"
             output_path = os.path.join(output_dir, output_filename)
             
             # Save generated art
-            with open(output_path, "wb") as f:
-                f.write(art_bytes)
+            await asyncio.to_thread(_write_bytes, output_path, art_bytes)
             
-            logger.info(f"Art saved to: {output_path}")
+            logger.info("Art saved to: %s", output_path)
             return output_path
             
         except Exception as e:
-            logger.error(f"Error generating art from {photo_path}: {str(e)}", exc_info=True)
+            logger.error("Error generating art from %s: %s", photo_path, e)
             raise
     
-    def generate_sticker(self, photo_path: str, output_dir: Optional[str] = None) -> str:
+    async def generate_sticker(self, photo_path: str, output_dir: Optional[str] = None) -> str:
         """Generate sticker-style art from a pet photo file and save to disk.
         
         Args:
@@ -339,43 +639,30 @@ class GeminiGenerator:
             Exception: If generation fails
         """
         try:
-            # Read photo from file
-            with open(photo_path, "rb") as f:
-                photo_bytes = f.read()
-            
-            logger.info(f"Generating sticker from photo: {photo_path}")
+            # Read photo from file (off the event loop)
+            photo_bytes = await asyncio.to_thread(_read_bytes, photo_path)
             
-            # Generate sticker using the async method (sync wrapper)
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+            logger.debug("Generating sticker from photo: %s", photo_path)
             
-            sticker_bytes = loop.run_until_complete(
-                self.generate(photo_bytes, STICKER_PROMPT)
-            )
+            sticker_bytes = await self.generate(photo_bytes, STICKER_PROMPT)
             
             # Determine output path
             if output_dir is None:
                 output_dir = os.path.dirname(photo_path)
             
-            os.makedirs(output_dir, exist_ok=True)
+            await _aensure_dir(output_dir)
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"sticker_{timestamp}.png"
+            output_filename = f"sticker_{_next_stamp()}.png"
             output_path = os.path.join(output_dir, output_filename)
             
             # Save generated sticker
-            with open(output_path, "wb") as f:
-                f.write(sticker_bytes)
+            await asyncio.to_thread(_write_bytes, output_path, sticker_bytes)
             
-            logger.info(f"Sticker saved to: {output_path}")
+            logger.info("Sticker saved to: %s", output_path)
             return output_path
             
         except Exception as e:
-            logger.error(f"Error generating sticker from {photo_path}: {str(e)}", exc_info=True)
+            logger.error("Error generating sticker from %s: %s", photo_path, e)
             raise
     
     def generate_story(
@@ -397,8 +684,6 @@ class GeminiGenerator:
             Generated story text
         """
         try:
-            import asyncio
-            
             # Create prompt for story generation
             story_prompt = f"""Crie uma historinha curta e encantadora para um livro de colorir sobre {pet_name}.
 
@@ -426,18 +711,11 @@ Parte {num_pages}: [texto da última página]
 
 IMPORTANTE: Não use emojis, apenas texto puro. Cada parte deve ser independente mas fazer sentido no contexto geral da historinha."""
 
-            logger.info(f"Generating story for {pet_name} with {num_pages} pages")
-            
-            # Use text generation model (not image generation)
-            # Try to get event loop
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+            logger.info("Generating story for %s with %d pages", pet_name, num_pages)
             
             # Generate story using Gemini text model
             # Use the same model but for text generation
+            self._own_client("_client", "generative")
             response = self.model.generate_content(story_prompt)
             
             if not response.candidates or not response.candidates[0].content.parts:
@@ -452,17 +730,17 @@ IMPORTANTE: Não use emojis, apenas texto puro. Cada parte deve ser independente
             if not story_text:
                 raise ValueError("No text found in story response")
             
-            logger.info(f"Story generated successfully for {pet_name} ({len(story_text)} characters)")
+            logger.info("Story generated successfully for %s (%d characters)", pet_name, len(story_text))
             return story_text.strip()
             
         except Exception as e:
-            logger.error(f"Error generating story for {pet_name}: {str(e)}", exc_info=True)
+            logger.error("Error generating story for %s: %s", pet_name, e, exc_info=True)
             # Return a simple fallback story
             fallback_story = f"Esta é a história de {pet_name}.\n\n"
             for i in range(num_pages):
                 fallback_story += f"Parte {i+1}: {pet_name} é um pet muito especial. Na data {pet_date}, aconteceram momentos incríveis!\n\n"
                 if i < num_pages - 1:
                     fallback_story += "---\n\n"
-            logger.warning(f"Using fallback story for {pet_name}")
+            logger.warning("Using fallback story for %s", pet_name)
             return fallback_story
 
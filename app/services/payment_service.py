@@ -1,15 +1,76 @@
 """Payment service for Mercado Pago integration."""
 
+import asyncio
 import logging
-from typing import Dict, Optional
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
 import mercadopago
+import requests
+from mercadopago.config import RequestOptions
+from mercadopago.http import HttpClient
+from requests.adapters import HTTPAdapter
 
 from app.core.config import settings
+from app.services.payment_storage import payment_storage
+from app.utils.retry import aretry
 
 logger = logging.getLogger(__name__)
 
+# HTTP statuses worth retrying (rate limiting and server errors)
+TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Short-lived cache for payment lookups (webhooks and redirects repeat them)
+PAYMENT_INFO_CACHE_TTL_SECONDS = 60
+PAYMENT_INFO_CACHE_MAX_SIZE = 1024
+# Only final statuses are cached - a cached "pending" would hide the later "approved"
+FINAL_PAYMENT_STATUSES = frozenset({"approved", "rejected", "cancelled", "refunded", "charged_back"})
+
+
+class _TransientPaymentError(Exception):
+    """Mercado Pago answered with a status that is worth retrying."""
+
+
+class _PooledHttpClient(HttpClient):
+    """Mercado Pago HTTP client that keeps one requests.Session.
+    
+    The SDK's default client opens a new session (and TLS connection) per
+    call. Reusing the session keeps connections to the API alive between
+    calls. Retries are left to PaymentService._sdk_call, so the SDK's
+    retry arguments are ignored.
+    """
+
+    def __init__(self, pool_size: int = 10):
+        """Initialize the pooled client.
+        
+        Args:
+            pool_size: Connections kept alive per host
+        """
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+        """Execute a request on the shared session.
+        
+        Returns:
+            SDK response dictionary ({"status": ..., "response": ...})
+        """
+        api_result = self.session.request(method, url, **kwargs)
+        response = {"status": api_result.status_code, "response": None}
+        if api_result.status_code != 204 and api_result.content:
+            try:
+                response["response"] = api_result.json()
+            except ValueError:
+                # Non-JSON error pages (e.g. from a proxy) are reported by status only
+                logger.warning(f"Mercado Pago returned a non-JSON body (HTTP {api_result.status_code})")
+        return response
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
 
 class PaymentService:
     """Service for handling Mercado Pago payments."""
@@ -24,10 +85,54 @@ class PaymentService:
         if not self.access_token:
             raise ValueError("MERCADOPAGO_ACCESS_TOKEN must be set")
         
-        self.sdk = mercadopago.SDK(self.access_token)
+        self.http_client = _PooledHttpClient()
+        self.sdk = mercadopago.SDK(self.access_token, http_client=self.http_client)
         self.price = settings.MERCADOPAGO_PRODUCT_PRICE
+        # Preference fields that are the same for every checkout
+        self._preference_template = {
+            "auto_return": "approved",  # Redirect automatically if approved
+            "notification_url": f"{settings.API_BASE_URL.rstrip('/')}/api/payment/webhook",  # Webhook URL
+            "statement_descriptor": "PetStory Art",
+            "expires": True,
+        }
+        self._item_template = {
+            "quantity": 1,
+            "currency_id": "BRL",
+            "unit_price": float(self.price),
+        }
+        # payment_id -> (expires_at, payment info), oldest first
+        self._payment_info_cache: Dict[str, Tuple[float, Dict]] = {}
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self.http_client.close()
+
+    async def _sdk_call(self, fn: Callable[..., Dict], *args) -> Dict:
+        """Run a blocking SDK call in a thread, retrying transient failures.
+        
+        Args:
+            fn: SDK method, e.g. ``self.sdk.payment().get``
+            *args: Positional arguments for fn
+            
+        Returns:
+            SDK response dictionary ({"status": ..., "response": ...})
+            
+        Raises:
+            Exception: If the last attempt still fails
+        """
+        async def _attempt() -> Dict:
+            response = await asyncio.to_thread(fn, *args)
+            if response.get("status") in TRANSIENT_STATUSES:
+                raise _TransientPaymentError(f"Mercado Pago returned HTTP {response['status']}")
+            return response
+        
+        return await aretry(
+            _attempt,
+            exceptions=(_TransientPaymentError, requests.ConnectionError, requests.Timeout),
+            description="Mercado Pago request",
+        )
 
-    def create_payment_preference(
+    async def create_payment_preference(
         self,
         email: str,
         pet_name: str,
@@ -48,14 +153,14 @@ class PaymentService:
             Dictionary with preference data including init_point (checkout URL)
         """
         try:
+            now = datetime.now()
             preference_data = {
+                **self._preference_template,
                 "items": [
                     {
+                        **self._item_template,
                         "title": f"Kit Digital do {pet_name} - PetStory",
                         "description": f"Kit digital completo com livro de colorir e página de homenagem para {pet_name}",
-                        "quantity": 1,
-                        "currency_id": "BRL",
-                        "unit_price": float(self.price),
                     }
                 ],
                 "payer": {
@@ -66,17 +171,19 @@ class PaymentService:
                     "failure": failure_url,
                     "pending": pending_url,
                 },
-                "auto_return": "approved",  # Redirect automatically if approved
-                "notification_url": f"{settings.API_BASE_URL.rstrip('/')}/api/payment/webhook",  # Webhook URL
-                "external_reference": f"{email}_{pet_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                "statement_descriptor": "PetStory Art",
-                "expires": True,
-                "expiration_date_from": datetime.now().isoformat(),
-                "expiration_date_to": (datetime.now() + timedelta(days=1)).isoformat(),  # Valid for 1 day
+                "external_reference": f"{email}_{pet_name}_{now:%Y%m%d_%H%M%S}",
+                "expiration_date_from": now.isoformat(),
+                "expiration_date_to": (now + timedelta(days=1)).isoformat(),  # Valid for 1 day
             }
 
+            # One idempotency key for every attempt, so a retried POST whose first
+            # attempt reached Mercado Pago returns that preference instead of a new one
+            request_options = RequestOptions(custom_headers={"x-idempotency-key": uuid.uuid4().hex})
+            
             logger.info(f"Creating payment preference for {email} - {pet_name}")
-            preference_response = self.sdk.preference().create(preference_data)
+            preference_response = await self._sdk_call(
+                self.sdk.preference().create, preference_data, request_options
+            )
             
             logger.debug(f"Mercado Pago response status: {preference_response.get('status')}")
             logger.debug(f"Mercado Pago response: {preference_response}")
@@ -104,17 +211,38 @@ class PaymentService:
             logger.error(f"Error creating payment preference: {e}", exc_info=True)
             raise
 
-    def get_payment_info(self, payment_id: str) -> Optional[Dict]:
+    async def get_payment_info(self, payment_id: str) -> Optional[Dict]:
         """Get payment information by ID.
         
+        Payments in a final status are cached for PAYMENT_INFO_CACHE_TTL_SECONDS,
+        so repeated webhooks and redirects do not query Mercado Pago again.
+        
         Args:
             payment_id: Mercado Pago payment ID
             
         Returns:
             Payment information dictionary or None if not found
         """
+        key = str(payment_id)
+        now = time.monotonic()
+        cached = self._payment_info_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        payment_info = await self._fetch_payment_info(payment_id)
+        if payment_info and payment_info.get("status") in FINAL_PAYMENT_STATUSES:
+            if len(self._payment_info_cache) >= PAYMENT_INFO_CACHE_MAX_SIZE:
+                # Evict the oldest entry
+                self._payment_info_cache.pop(next(iter(self._payment_info_cache)))
+            self._payment_info_cache[key] = (now + PAYMENT_INFO_CACHE_TTL_SECONDS, payment_info)
+        else:
+            self._payment_info_cache.pop(key, None)
+        return payment_info
+
+    async def _fetch_payment_info(self, payment_id: str) -> Optional[Dict]:
+        """Query Mercado Pago for a payment (see get_payment_info)."""
         try:
-            payment_response = self.sdk.payment().get(payment_id)
+            payment_response = await self._sdk_call(self.sdk.payment().get, payment_id)
             
             if payment_response["status"] == 200:
                 return payment_response["response"]
@@ -126,7 +254,7 @@ class PaymentService:
             logger.error(f"Error getting payment info for {payment_id}: {e}", exc_info=True)
             return None
 
-    def verify_payment_status(self, payment_id: str) -> Optional[str]:
+    async def verify_payment_status(self, payment_id: str) -> Optional[str]:
         """Verify payment status.
         
         Args:
@@ -135,12 +263,12 @@ class PaymentService:
         Returns:
             Payment status: 'approved', 'pending', 'rejected', 'cancelled', or None
         """
-        payment_info = self.get_payment_info(payment_id)
+        payment_info = await self.get_payment_info(payment_id)
         if payment_info:
             return payment_info.get("status")
         return None
 
-    def is_payment_approved(self, payment_id: str) -> bool:
+    async def is_payment_approved(self, payment_id: str) -> bool:
         """Check if payment is approved.
         
         Args:
@@ -149,6 +277,9 @@ class PaymentService:
         Returns:
             True if payment is approved, False otherwise
         """
-        status = self.verify_payment_status(payment_id)
+        # Approval is final: a locally stored approval needs no API call
+        if await asyncio.to_thread(payment_storage.is_payment_approved, payment_id):
+            return True
+        status = await self.verify_payment_status(payment_id)
         return status == "approved"
 
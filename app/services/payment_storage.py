@@ -1,10 +1,13 @@
 """Payment storage using SQLModel database."""
 
+import asyncio
 import logging
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from app.core.database import engine
@@ -47,6 +50,26 @@ class PaymentStorage:
             pet_name: Pet name (optional)
             external_reference: External reference from Mercado Pago
         """
+        # A concurrent insert of the same payment_id (e.g. webhook + redirect) hits
+        # the unique constraint; the second attempt then updates that row instead.
+        for attempt in range(2):
+            try:
+                self._save_payment(payment_id, status, email, pet_name, external_reference)
+                return
+            except IntegrityError:
+                if attempt == 1:
+                    raise
+                logger.info(f"Payment {payment_id} was inserted concurrently - updating instead")
+
+    def _save_payment(
+        self,
+        payment_id: str,
+        status: str,
+        email: str,
+        pet_name: Optional[str],
+        external_reference: Optional[str],
+    ) -> None:
+        """Insert or update a payment row in one transaction (see save_payment)."""
         with self._get_session() as session:
             # Check if payment already exists
             existing = session.exec(
@@ -152,35 +175,50 @@ class PaymentStorage:
             # Find approved payment for this email and pet within last 24 hours
             cutoff_time = datetime.now() - timedelta(hours=24)
             
-            payment = session.exec(
-                select(Payment)
+            # Single seek on ix_payments_owner_status_created; only the id is read
+            payment_id = session.exec(
+                select(Payment.id)
                 .where(Payment.email == email)
                 .where(Payment.pet_name == pet_name)
                 .where(Payment.status == "approved")
                 .where(Payment.created_at >= cutoff_time)
+                .limit(1)
             ).first()
             
-            return payment is not None
+            return payment_id is not None
 
     def cleanup_old_payments(self) -> None:
         """Remove payments older than cleanup threshold."""
         with self._get_session() as session:
             cutoff_time = datetime.now() - self._cleanup_threshold
             
-            old_payments = session.exec(
-                select(Payment).where(Payment.created_at < cutoff_time)
-            ).all()
-            
-            count = 0
-            for payment in old_payments:
-                session.delete(payment)
-                count += 1
+            # One DELETE statement instead of loading and deleting rows one by one
+            result = session.exec(
+                delete(Payment).where(Payment.created_at < cutoff_time)
+            )
+            count = result.rowcount
             
             session.commit()
             
             if count > 0:
                 logger.info(f"Cleaned up {count} old payment records")
 
+    async def run_cleanup_loop(self, interval_seconds: float) -> None:
+        """Call cleanup_old_payments every interval_seconds until cancelled.
+        
+        The cleanup runs in a worker thread so the event loop is not blocked
+        by the database. Errors are logged and the loop keeps going.
+        
+        Args:
+            interval_seconds: Seconds between cleanups
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.cleanup_old_payments)
+            except Exception as e:
+                logger.error(f"Error cleaning up old payments: {e}", exc_info=True)
+
 
 # Global instance
 payment_storage = PaymentStorage()
@@ -1,17 +1,193 @@
 """PDF generation service for compiling coloring book pages."""
 
+import asyncio
+import hashlib
 import io
 import logging
+import multiprocessing
 import os
 import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 from fpdf import FPDF
 from PIL import Image
 
+from app.utils.image import (
+    PNG_COLOR_TYPE_GRAY,
+    PNG_COLOR_TYPE_RGB,
+    PNG_HEADER_SIZE,
+    SNIFF_HEADER_SIZE,
+    read_png_header,
+    sniff_image_type,
+)
+
 logger = logging.getLogger(__name__)
 
+# PNGs FPDF can take as is: 8-bit grayscale/RGB (no alpha, no palette), not interlaced
+PASSTHROUGH_PNG_COLOR_TYPES = frozenset({PNG_COLOR_TYPE_GRAY, PNG_COLOR_TYPE_RGB})
+
+# Threads reading/decoding images before the (serial) FPDF page layout.
+# Pillow's decoders release the GIL, so this scales with cores.
+PDF_PREPARE_WORKERS = min(8, os.cpu_count() or 1)
+
+# Processes for create_pdf_from_images_async (layout and compression hold the GIL)
+PDF_PROCESS_WORKERS = os.cpu_count() or 1
+
+# Formats images that need re-encoding can be embedded in
+PDF_IMAGE_FORMATS = ("PNG", "JPEG")
+# JPEG settings for re-encoded pages: no chroma subsampling keeps line art sharp
+PDF_JPEG_QUALITY = 92
+PDF_JPEG_SUBSAMPLING = 0
+
+MM_PER_INCH = 25.4
+
+# stream_pdf_from_images: PDFs larger than this spill from memory to a temp file
+PDF_STREAM_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+PDF_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Budget for prepared images a PDFService keeps for reuse (encoded bytes or decoded pixels)
+PDF_PREPARED_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+PreparedImage = Tuple[Union[io.BytesIO, Image.Image], int, int]
+# Cache key: BLAKE2b digest of the image bytes, output format, max size
+PreparedImageKey = Tuple[bytes, str, Optional[Tuple[int, int]]]
+
+
+def _prepare_image(
+    image_bytes: bytes,
+    output_format: str = "PNG",
+    max_size: Optional[Tuple[int, int]] = None,
+) -> PreparedImage:
+    """Prepare image bytes for ``pdf.image`` with as little decoding as possible.
+    
+    JPEGs and plain PNGs are handed to FPDF as the original bytes (JPEG data
+    is embedded as is; FPDF decodes PNGs once itself). Anything else is
+    decoded once here and converted to RGB, then embedded as output_format:
+    for "PNG" the decoded image is passed on directly (FPDF compresses it
+    losslessly), for "JPEG" it is encoded once here and embedded as is.
+    
+    Args:
+        image_bytes: Image file contents
+        output_format: "PNG" (lossless) or "JPEG" (much faster and smaller)
+        max_size: Largest (width, height) in pixels for re-encoded images;
+            larger ones are downscaled first, keeping the aspect ratio
+        
+    Returns:
+        Tuple of (source for pdf.image, width in pixels, height in pixels)
+    """
+    image_stream = io.BytesIO(image_bytes)
+    png_header = read_png_header(image_bytes[:PNG_HEADER_SIZE])
+    if png_header is not None:
+        # PNG: the size is in the IHDR chunk, no need for PIL
+        if (
+            png_header.bit_depth == 8
+            and png_header.color_type in PASSTHROUGH_PNG_COLOR_TYPES
+            and not png_header.interlace
+        ):
+            return image_stream, png_header.width, png_header.height
+    elif sniff_image_type(image_bytes[:SNIFF_HEADER_SIZE]) == "image/jpeg":
+        # Lazy open: only the header is parsed, enough for the size
+        width, height = Image.open(image_stream).size
+        image_stream.seek(0)
+        return image_stream, width, height
+    
+    # This is the only decode
+    img = _flatten_to_rgb(Image.open(image_stream))
+    if max_size is not None and (img.width > max_size[0] or img.height > max_size[1]):
+        # Pixels beyond what the page can show only cost encode time and PDF size
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    if output_format == "JPEG":
+        jpeg_buffer = io.BytesIO()
+        img.save(
+            jpeg_buffer,
+            format="JPEG",
+            quality=PDF_JPEG_QUALITY,
+            subsampling=PDF_JPEG_SUBSAMPLING,
+        )
+        jpeg_buffer.seek(0)
+        return jpeg_buffer, img.width, img.height
+    return img, img.width, img.height
+
+
+def _flatten_to_rgb(img: Image.Image) -> Image.Image:
+    """Return an image as RGB, placing any real transparency on white.
+    
+    A plain convert("RGB") just drops the alpha channel, so transparent areas
+    show whatever color they store (usually black).
+    
+    Args:
+        img: Image in any mode
+        
+    Returns:
+        The same image if it is already RGB, otherwise an RGB copy
+    """
+    if img.mode == "RGB":
+        return img
+    if img.mode in ("LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+    if img.mode == "RGBA":
+        alpha = img.getchannel("A")
+        if alpha.getextrema() != (255, 255):
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=alpha)
+            return background
+    # Fully opaque or no alpha: a plain conversion is enough
+    return img.convert("RGB")
+
+
+def _prepared_image_key(
+    image_bytes: bytes,
+    output_format: str,
+    max_size: Optional[Tuple[int, int]],
+) -> PreparedImageKey:
+    """Build the prepared-image cache key (BLAKE2b is fast on large inputs)."""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest(), output_format, max_size
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared PDF process pool, creating it on first use.
+    
+    Workers are started with "spawn", not fork: by the time a PDF is built the
+    process runs gRPC, logging and executor threads, and forking a threaded
+    process can deadlock the child (gRPC does not support fork at all).
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PDF_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the shared PDF process pool, if it was started."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
+            _process_pool = None
+
+
+def _create_pdf_in_process(
+    images: List[bytes],
+    output_path: Optional[str],
+    output_format: str,
+    target_dpi: Optional[int],
+) -> Union[bytes, bytearray]:
+    """Entry point for pool processes (a PDFService itself is not picklable)."""
+    return PDFService().create_pdf_from_images(images, output_path, output_format, target_dpi)
+
 
 class PDFService:
     """Service for creating PDFs from images."""
@@ -20,6 +196,13 @@ class PDFService:
     A4_WIDTH_MM = 210
     A4_HEIGHT_MM = 297
     MARGIN_MM = 10
+    
+    # Printable area inside the margins and the page center, for fitting images
+    A4_AVAILABLE_WIDTH_MM = float(A4_WIDTH_MM - 2 * MARGIN_MM)
+    A4_AVAILABLE_HEIGHT_MM = float(A4_HEIGHT_MM - 2 * MARGIN_MM)
+    A4_AVAILABLE_RATIO = A4_AVAILABLE_WIDTH_MM / A4_AVAILABLE_HEIGHT_MM
+    A4_CENTER_X_MM = A4_WIDTH_MM / 2
+    A4_CENTER_Y_MM = A4_HEIGHT_MM / 2
 
     def __init__(self):
         """Initialize PDF service."""
@@ -27,6 +210,80 @@ class PDFService:
         self.fonts_dir = Path(__file__).parent.parent.parent / "fonts"
         self.custom_font_path = self.fonts_dir / "PatrickHand-Regular.ttf"
         self.font_name = "PatrickHand"
+        
+        # Prepared images by content, reused across pages and PDFs (least recently used
+        # first). The app shares one instance (app.core.services.get_pdf_service), so
+        # resubmitted orders - whose art comes back from the Gemini cache - hit it too.
+        self._prepared_cache: "OrderedDict[PreparedImageKey, Tuple[Union[bytes, Image.Image], int, int, int]]" = OrderedDict()
+        self._prepared_cache_bytes = 0
+        self._prepared_cache_lock = threading.Lock()
+    
+    def _prepare_image_cached(
+        self,
+        image_bytes: bytes,
+        key: PreparedImageKey,
+        output_format: str,
+        max_size: Optional[Tuple[int, int]],
+    ) -> PreparedImage:
+        """Prepare image bytes for ``pdf.image``, reusing an earlier result for the same content.
+        
+        Encoded results are cached as bytes and handed out in a fresh BytesIO,
+        so concurrent PDFs never share a stream position.
+        
+        Args:
+            image_bytes: Image bytes (PNG/JPEG)
+            key: Cache key for image_bytes, output_format and max_size
+            output_format: See _prepare_image
+            max_size: See _prepare_image
+            
+        Returns:
+            The prepared image and its size in pixels
+        """
+        with self._prepared_cache_lock:
+            entry = self._prepared_cache.get(key)
+            if entry is not None:
+                self._prepared_cache.move_to_end(key)
+        
+        if entry is None:
+            image_source, img_width, img_height = _prepare_image(image_bytes, output_format, max_size)
+            if isinstance(image_source, io.BytesIO):
+                data = image_source.getvalue()
+                size = len(data)
+            else:
+                data = image_source
+                size = img_width * img_height * len(image_source.getbands())
+            entry = (data, img_width, img_height, size)
+            
+            with self._prepared_cache_lock:
+                if key not in self._prepared_cache:
+                    self._prepared_cache[key] = entry
+                    self._prepared_cache_bytes += size
+                    while self._prepared_cache_bytes > PDF_PREPARED_CACHE_MAX_BYTES and len(self._prepared_cache) > 1:
+                        _, evicted = self._prepared_cache.popitem(last=False)
+                        self._prepared_cache_bytes -= evicted[3]
+        
+        data, img_width, img_height, _ = entry
+        if isinstance(data, bytes):
+            return io.BytesIO(data), img_width, img_height
+        return data, img_width, img_height
+    
+    def _prepare_image_file(self, path: str) -> PreparedImage:
+        """Read an image file and prepare it for ``pdf.image`` through the cache."""
+        image_bytes = Path(path).read_bytes()
+        return self._prepare_image_cached(
+            image_bytes, _prepared_image_key(image_bytes, "PNG", None), "PNG", None
+        )
+    
+    def _get_prepared(self, prepared: Dict[str, "Future[PreparedImage]"], path: str) -> PreparedImage:
+        """Return the prefetched image for path, or prepare it now if it was not prefetched.
+        
+        Raises:
+            Exception: Whatever reading or decoding the file raised
+        """
+        future = prepared.get(path)
+        if future is None:
+            return self._prepare_image_file(path)
+        return future.result()
     
     def _add_custom_font(self, pdf: FPDF) -> None:
         """Add custom font to PDF if available.
@@ -69,93 +326,203 @@ class PDFService:
             pdf.set_font("Helvetica", style, size)
 
     def create_pdf_from_images(
-        self, images: List[bytes], output_path: Optional[str] = None
-    ) -> bytes:
+        self,
+        images: List[bytes],
+        output_path: Optional[str] = None,
+        output_format: str = "JPEG",
+        target_dpi: Optional[int] = 200,
+    ) -> Union[bytes, bytearray]:
         """Create a PDF from a list of image bytes.
         
         Args:
             images: List of image bytes (PNG/JPEG)
-            output_path: Optional path to save PDF. If None, returns bytes.
+            output_path: Optional path to save PDF. If None, returns the PDF.
+            output_format: How pages that must be re-encoded are embedded:
+                "JPEG" (default, fast and small) or "PNG" (lossless). JPEGs
+                and plain PNGs are always embedded unchanged.
+            target_dpi: Print resolution for re-encoded pages: larger images are
+                downscaled to fit the page at this DPI. None keeps all pixels.
             
         Returns:
-            PDF as bytes
+            PDF as a bytearray (empty bytes when saved to output_path)
+            
+        Raises:
+            ValueError: If output_format is not supported
         """
+        pdf = self._build_pdf_from_images(images, output_format, target_dpi)
+        
+        if output_path:
+            pdf.output(output_path)
+            logger.info(f"PDF saved to {output_path}")
+            return b""
+        else:
+            # fpdf2 builds the document in a bytearray; hand it over without another copy
+            pdf_bytes = pdf.output()
+            logger.info(f"PDF generated ({len(pdf_bytes)} bytes)")
+            return pdf_bytes
+    
+    async def create_pdf_from_images_async(
+        self,
+        images: List[bytes],
+        output_path: Optional[str] = None,
+        output_format: str = "JPEG",
+        target_dpi: Optional[int] = 200,
+    ) -> Union[bytes, bytearray]:
+        """Create a PDF in the shared process pool without blocking the event loop.
+        
+        Separate processes let concurrent PDFs use all cores; the prepared-image
+        cache of this instance is not used.
+        
+        Args:
+            images: List of image bytes (PNG/JPEG)
+            output_path: Optional path to save PDF. If None, returns the PDF.
+            output_format: See create_pdf_from_images
+            target_dpi: See create_pdf_from_images
+            
+        Returns:
+            PDF as a bytearray (empty bytes when saved to output_path)
+            
+        Raises:
+            ValueError: If output_format is not supported
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_process_pool(),
+            _create_pdf_in_process,
+            images,
+            output_path,
+            output_format,
+            target_dpi,
+        )
+    
+    def stream_pdf_from_images(
+        self,
+        images: List[bytes],
+        output_format: str = "JPEG",
+        target_dpi: Optional[int] = 200,
+        chunk_size: int = PDF_STREAM_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """Create a PDF from a list of image bytes and yield it in chunks.
+        
+        The document is spooled to a temporary file (kept in memory while it is
+        small), so callers such as a StreamingResponse never hold a second full
+        copy of it. Nothing is built until the first chunk is requested.
+        
+        Args:
+            images: List of image bytes (PNG/JPEG)
+            output_format: See create_pdf_from_images
+            target_dpi: See create_pdf_from_images
+            chunk_size: Size of the yielded chunks, in bytes
+            
+        Yields:
+            Consecutive chunks of the PDF
+            
+        Raises:
+            ValueError: If output_format is not supported
+        """
+        pdf = self._build_pdf_from_images(images, output_format, target_dpi)
+        
+        with tempfile.SpooledTemporaryFile(max_size=PDF_STREAM_SPOOL_MAX_SIZE) as spool:
+            pdf.output(spool)
+            # Drop FPDF's copy before streaming the spooled one
+            size = spool.tell()
+            del pdf
+            logger.info(f"PDF generated ({size} bytes), streaming")
+            spool.seek(0)
+            while chunk := spool.read(chunk_size):
+                yield chunk
+    
+    def _build_pdf_from_images(
+        self,
+        images: List[bytes],
+        output_format: str,
+        target_dpi: Optional[int],
+    ) -> FPDF:
+        """Lay out one page per image (see create_pdf_from_images).
+        
+        Returns:
+            The populated FPDF document
+            
+        Raises:
+            ValueError: If output_format is not supported
+        """
+        if output_format not in PDF_IMAGE_FORMATS:
+            raise ValueError(f"output_format must be one of {PDF_IMAGE_FORMATS}, got {output_format!r}")
+        
+        max_size = None
+        if target_dpi:
+            # Printable area of the page, in pixels at the target resolution
+            max_size = (
+                round(self.A4_AVAILABLE_WIDTH_MM / MM_PER_INCH * target_dpi),
+                round(self.A4_AVAILABLE_HEIGHT_MM / MM_PER_INCH * target_dpi),
+            )
+        
         pdf = FPDF(orientation="P", unit="mm", format="A4")
         
-        for idx, image_bytes in enumerate(images):
+        # Decode in parallel, once per distinct image; pages are still added in order below
+        with ThreadPoolExecutor(max_workers=PDF_PREPARE_WORKERS) as executor:
+            futures: Dict[PreparedImageKey, "Future[PreparedImage]"] = {}
+            prepared = []
+            for image_bytes in images:
+                key = _prepared_image_key(image_bytes, output_format, max_size)
+                if key not in futures:
+                    futures[key] = executor.submit(
+                        self._prepare_image_cached, image_bytes, key, output_format, max_size
+                    )
+                prepared.append(futures[key])
+        
+        # Log progress about every 10% instead of once per page
+        log_step = max(1, len(images) // 10)
+        added = 0
+        
+        for idx, future in enumerate(prepared):
             try:
-                # Load image
-                img = Image.open(io.BytesIO(image_bytes))
+                image_source, img_width, img_height = future.result()
                 
-                # Convert to RGB if necessary
-                if img.mode != "RGB":
-                    img = img.convert("RGB")
-                
-                # Calculate dimensions to fit A4 with margins
-                available_width = self.A4_WIDTH_MM - (2 * self.MARGIN_MM)
-                available_height = self.A4_HEIGHT_MM - (2 * self.MARGIN_MM)
-                
-                img_width, img_height = img.size
+                # Fit image to the printable area maintaining aspect ratio
                 aspect_ratio = img_width / img_height
-                
-                # Fit image to available space maintaining aspect ratio
-                if aspect_ratio > (available_width / available_height):
+                if aspect_ratio > self.A4_AVAILABLE_RATIO:
                     # Image is wider
-                    width = available_width
-                    height = available_width / aspect_ratio
+                    width = self.A4_AVAILABLE_WIDTH_MM
+                    height = width / aspect_ratio
                 else:
                     # Image is taller
-                    height = available_height
-                    width = available_height * aspect_ratio
+                    height = self.A4_AVAILABLE_HEIGHT_MM
+                    width = height * aspect_ratio
                 
                 # Center image
-                x_offset = (self.A4_WIDTH_MM - width) / 2
-                y_offset = (self.A4_HEIGHT_MM - height) / 2
-                
-                # Save image to temporary file for FPDF
-                temp_buffer = io.BytesIO()
-                img.save(temp_buffer, format="PNG")
-                temp_buffer.seek(0)
+                x_offset = self.A4_CENTER_X_MM - width * 0.5
+                y_offset = self.A4_CENTER_Y_MM - height * 0.5
                 
                 # Add page
                 pdf.add_page()
                 
                 # Add image to PDF
                 pdf.image(
-                    temp_buffer,
+                    image_source,
                     x=x_offset,
                     y=y_offset,
                     w=width,
                     h=height,
                 )
                 
-                logger.info(f"Added image {idx + 1}/{len(images)} to PDF")
+                added += 1
+                if (idx + 1) % log_step == 0:
+                    logger.info("Added image %d/%d to PDF", idx + 1, len(images))
                 
             except Exception as e:
+                # Tracebacks are costly to capture; only include them when debugging
                 logger.error(
-                    f"Error adding image {idx + 1} to PDF: {str(e)}",
-                    exc_info=True,
+                    "Error adding image %d to PDF: %s",
+                    idx + 1,
+                    e,
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
                 )
                 # Continue with next image even if one fails
                 continue
         
-        if output_path:
-            pdf.output(output_path)
-            logger.info(f"PDF saved to {output_path}")
-            return b""
-        else:
-            # Return PDF as bytes
-            # pdf.output(dest="S") returns bytes/bytearray, not a string
-            pdf_output = pdf.output(dest="S")
-            if isinstance(pdf_output, bytearray):
-                pdf_bytes = bytes(pdf_output)
-            elif isinstance(pdf_output, bytes):
-                pdf_bytes = pdf_output
-            else:
-                # If it's a string, encode it
-                pdf_bytes = pdf_output.encode("latin-1")
-            logger.info(f"PDF generated ({len(pdf_bytes)} bytes)")
-            return pdf_bytes
+        logger.info("Laid out %d/%d image(s) in PDF", added, len(images))
+        return pdf
     
     def clean_text(self, text: str) -> str:
         """Remove emojis and non-Latin characters that FPDF cannot handle.
@@ -287,6 +654,11 @@ class PDFService:
             if os.path.exists(first_original_path):
                 biography_image_path = first_original_path
         
+        # Read and decode every image file in parallel before laying out the pages
+        image_paths = dict.fromkeys([*generated_art_paths, *(original_image_paths or []), *(sticker_paths or [])])
+        with ThreadPoolExecutor(max_workers=PDF_PREPARE_WORKERS) as executor:
+            prepared_images = {path: executor.submit(self._prepare_image_file, path) for path in image_paths}
+        
         pdf = FPDF(orientation="P", unit="mm", format="A4")
         pdf.set_auto_page_break(auto=False)  # Disable auto page break for better control
         
@@ -329,11 +701,7 @@ class PDFService:
         
         # Image centered below title - USE FIRST ART IMAGE
         try:
-            img = Image.open(first_art_path)
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-            
-            img_width, img_height = img.size
+            image_source, img_width, img_height = self._get_prepared(prepared_images, first_art_path)
             aspect_ratio = img_width / img_height
             
             # Image dimensions for cover (large but with margins)
@@ -351,11 +719,7 @@ class PDFService:
             x = (self.A4_WIDTH_MM - width) / 2
             y = title_y + 25
             
-            temp_buffer = io.BytesIO()
-            img.save(temp_buffer, format="PNG")
-            temp_buffer.seek(0)
-            
-            pdf.image(temp_buffer, x=x, y=y, w=width, h=height)
+            pdf.image(image_source, x=x, y=y, w=width, h=height)
         except Exception as e:
             logger.warning(f"Could not add art image to cover: {e}")
         
@@ -442,11 +806,7 @@ class PDFService:
                     photo_path = all_original_photos[photo_idx]
                     
                     try:
-                        img = Image.open(photo_path)
-                        if img.mode != "RGB":
-                            img = img.convert("RGB")
-                        
-                        img_width, img_height = img.size
+                        image_source, img_width, img_height = self._get_prepared(prepared_images, photo_path)
                         aspect_ratio = img_width / img_height
                         
                         # Calculate dimensions maintaining aspect ratio
@@ -472,11 +832,7 @@ class PDFService:
                         )
                         
                         # Add photo
-                        temp_buffer = io.BytesIO()
-                        img.save(temp_buffer, format="PNG")
-                        temp_buffer.seek(0)
-                        
-                        pdf.image(temp_buffer, x=cell_x, y=cell_y, w=width, h=height)
+                        pdf.image(image_source, x=cell_x, y=cell_y, w=width, h=height)
                         
                         photo_idx += 1
                         current_x += photo_width + photo_spacing
@@ -549,11 +905,7 @@ class PDFService:
                 story_height = 40
             
             try:
-                img = Image.open(art_path)
-                if img.mode != "RGB":
-                    img = img.convert("RGB")
-                
-                img_width, img_height = img.size
+                image_source, img_width, img_height = self._get_prepared(prepared_images, art_path)
                 aspect_ratio = img_width / img_height
                 
                 # Calculate dimensions to fill available space
@@ -579,11 +931,7 @@ class PDFService:
                     x = (self.A4_WIDTH_MM - width) / 2
                     y = story_height + 5
                 
-                temp_buffer = io.BytesIO()
-                img.save(temp_buffer, format="PNG")
-                temp_buffer.seek(0)
-                
-                pdf.image(temp_buffer, x=x, y=y, w=width, h=height)
+                pdf.image(image_source, x=x, y=y, w=width, h=height)
             except Exception as e:
                 logger.error(f"Error adding coloring page {idx} image: {e}")
         
@@ -632,12 +980,9 @@ class PDFService:
                     continue
                 
                 try:
-                    img = Image.open(sticker_path)
-                    if img.mode != "RGB":
-                        img = img.convert("RGB")
+                    image_source, img_width, img_height = self._get_prepared(prepared_images, sticker_path)
                     
                     # Get image dimensions and aspect ratio
-                    img_width, img_height = img.size
                     aspect_ratio = img_width / img_height
                     
                     # Calculate dimensions maintaining aspect ratio
@@ -659,12 +1004,8 @@ class PDFService:
                     x = cell_x + (sticker_size - width) / 2
                     y = cell_y + (sticker_size - height) / 2
                     
-                    temp_buffer = io.BytesIO()
-                    img.save(temp_buffer, format="PNG")
-                    temp_buffer.seek(0)
-                    
                     # Add image maintaining aspect ratio
-                    pdf.image(temp_buffer, x=x, y=y, w=width, h=height)
+                    pdf.image(image_source, x=x, y=y, w=width, h=height)
                 except Exception as e:
                     logger.error(f"Error adding sticker {row * 3 + col + 1} from {sticker_path}: {e}")
         
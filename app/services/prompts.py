@@ -0,0 +1,94 @@
+"""Image generation prompts shared by the image generation backends."""
+
+__all__ = ["BOBBIE_GOODS_PROMPT", "STICKER_PROMPT"]
+
+# System Prompt para estilo Bobbie Goods
+# BOBBIE_GOODS_PROMPT = (
+#     "Create a vector-style coloring book page of this pet, reimagined as a 'Bobbie Goods' character. "
+#     "Do NOT trace the photo realistically. Instead, caricature the pet to look extra chubby and soft. "
+#     "MANDATORY STYLE RULES: "
+#     "1. BODY SHAPE: Make the pet look round, squishy, and potato-shaped. Shorten the legs to be cute and stubby. "
+#     "2. FACE: Ignore realistic eyes. Use widely spaced, small black dots for eyes (kawaii style). Small, simple nose. "
+#     "3. LINE WORK: Use extremely thick, mono-weight, bold black lines (like a thick Sharpie marker). "
+#     "4. PAWS: Simplify paws into rounded 'nubs' or simple shapes. No realistic claws or toes. "
+#     "5. DECORATION: Add small floating sparkles, stars, or hearts around the pet to fill empty space. "
+#     "6. TECH SPECS: Pure white background. STRICTLY NO SHADING, NO GRAYSCALE, NO TEXTURE."
+# )
+
+BOBBIE_GOODS_PROMPT = (
+    "Convert this pet photo into a clean, realistic line art illustration suitable for a coloring book.\n\n"
+
+    "CORE GOAL:\n"
+    "- Preserve the pet's REAL appearance, proportions, and expression.\n"
+    "- The pet must remain clearly recognizable to its owner.\n\n"
+
+    "STYLE RULES:\n"
+    "- Create a black-and-white outline drawing (line art).\n"
+    "- Follow the natural contours of the pet from the photo.\n"
+    "- Use smooth, confident, continuous black lines.\n\n"
+
+    "LINE WORK:\n"
+    "- Medium-to-thick clean outlines.\n"
+    "- No sketchy lines.\n"
+    "- No cross-hatching.\n"
+    "- No shading, no gradients, no gray tones.\n\n"
+
+    "DETAIL CONTROL:\n"
+    "- Simplify fur into clean contour shapes.\n"
+    "- Keep facial features accurate but simplified.\n"
+    "- Eyes, nose, and mouth should reflect the real pet.\n\n"
+
+    "COLORING BOOK REQUIREMENTS:\n"
+    "- Pure white background.\n"
+    "- Black lines only.\n"
+    "- Large enclosed areas suitable for coloring.\n\n"
+
+    "COMPOSITION:\n"
+    "- Center the pet.\n"
+    "- Remove background elements completely.\n\n"
+
+    "FINAL OUTPUT:\n"
+    "- Clean, printable coloring book page.\n"
+    "- No artistic style exaggeration.\n"
+)
+
+# Prompt específico para adesivos (stickers), inspirado em cartelas coloridas com contorno branco
+STICKER_PROMPT = (
+    "Create a colorful sticker sheet style illustration of this pet, similar to kawaii pet sticker sheets.\n\n"
+
+    "OVERALL STYLE (VERY IMPORTANT):\n"
+    "- Cute, cartoon / kawaii style.\n"
+    "- Use flat, vibrant colors (no gradients, no complex shading).\n"
+    "- Strong black outline around the drawing.\n"
+    "- Add a THICK WHITE BORDER around the entire sticker shape (die-cut sticker style).\n"
+    "- The sticker must look like it was cut out from a sticker sheet.\n\n"
+
+    "PET DESIGN:\n"
+    "- The pet must be clearly recognizable from the photo.\n"
+    "- Slightly exaggerate cuteness: bigger head, bigger eyes, softer body shapes.\n"
+    "- Keep main colors of the real pet (fur color, spots, etc.).\n"
+    "- Use clean, simple shapes and minimal details so it works at small size.\n\n"
+
+    "DECORATIVE ELEMENTS:\n"
+    "- Around or near the pet, you MAY add small extra icons:\n"
+    "  hearts, paw prints, bones, fish, food bowls, toys, etc.\n"
+    "- These icons should also have black outline and thick white border.\n"
+    "- Do NOT add text inside the sticker.\n\n"
+
+    "COMPOSITION:\n"
+    "- Center the pet.\n"
+    "- Leave enough empty space around the pet for the white border.\n"
+    "- Avoid cropping ears or tail: the full pet must fit inside the sticker.\n\n"
+
+    "BACKGROUND:\n"
+    "- Use a pure white background behind the sticker (so it blends with the page).\n"
+    "- The sticker itself must be visually separated by the thick white border.\n\n"
+
+    "TECHNICAL:\n"
+    "- High resolution, sharp lines.\n"
+    "- High contrast outlines so the shape is clear when printed small (2–3 cm).\n"
+    "- No photographic textures. 100% illustrated look.\n\n"
+
+    "FINAL OUTPUT:\n"
+    "- A single sticker-style illustration of the pet, ready to be printed on a sticker sheet.\n"
+)
@@ -0,0 +1,95 @@
+"""Utility functions for identifying image files."""
+
+import logging
+import struct
+from typing import NamedTuple, Optional
+
+import PIL
+from PIL import features
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Number of leading bytes needed by sniff_image_type
+SNIFF_HEADER_SIZE = 12
+
+# Signature + IHDR chunk header (length, type) + IHDR fields (read_png_header)
+PNG_HEADER_SIZE = 29
+PNG_COLOR_TYPE_GRAY = 0
+PNG_COLOR_TYPE_RGB = 2
+
+
+class PngHeader(NamedTuple):
+    """Fields of a PNG IHDR chunk."""
+
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+    interlace: int
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Detect the MIME type of an image from its magic bytes.
+    
+    Args:
+        header: Leading bytes of the file (at least SNIFF_HEADER_SIZE for WEBP)
+        
+    Returns:
+        "image/jpeg", "image/png" or "image/webp", or None if not recognized
+    """
+    if header[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if header[:8] == PNG_SIGNATURE:
+        return "image/png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def read_png_header(header: bytes) -> Optional[PngHeader]:
+    """Parse the IHDR chunk of a PNG without decoding the image.
+    
+    Args:
+        header: Leading bytes of the file (at least PNG_HEADER_SIZE)
+        
+    Returns:
+        PngHeader, or None if the bytes are not a PNG header
+    """
+    if len(header) < PNG_HEADER_SIZE or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        return None
+    width, height, bit_depth, color_type, _compression, _filter, interlace = struct.unpack(
+        ">IIBBBBB", header[16:PNG_HEADER_SIZE]
+    )
+    return PngHeader(width, height, bit_depth, color_type, interlace)
+
+
+def is_rgb_png(header: bytes) -> bool:
+    """Check whether a PNG is 8-bit RGB (Pillow mode "RGB") from its header.
+    
+    Args:
+        header: Leading bytes of the file (at least PNG_HEADER_SIZE)
+        
+    Returns:
+        True for an 8-bit truecolor PNG without alpha, False otherwise
+    """
+    png = read_png_header(header)
+    return png is not None and png.bit_depth == 8 and png.color_type == PNG_COLOR_TYPE_RGB
+
+
+def log_pillow_build() -> None:
+    """Log which accelerated codecs the installed Pillow was built with.
+    
+    Page decoding and JPEG encoding for PDFs run in Pillow's C code; a build
+    without libjpeg-turbo is several times slower at both.
+    """
+    jpeg_turbo = features.check_feature("libjpeg_turbo")
+    logger.info(
+        "Pillow %s (libjpeg-turbo %s, zlib %s)",
+        PIL.__version__,
+        features.version_feature("libjpeg_turbo") if jpeg_turbo else "not available",
+        features.version("zlib"),
+    )
+    if not jpeg_turbo:
+        logger.warning("Pillow was built without libjpeg-turbo - JPEG decode/encode will be slow")
@@ -0,0 +1,54 @@
+"""Utility functions for retrying transient failures."""
+
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def aretry(
+    fn: Callable[[], Awaitable[T]],
+    *,
+    retries: int = 3,
+    base: float = 0.5,
+    cap: float = 8.0,
+    exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+    description: str = "operation",
+) -> T:
+    """Await fn(), retrying transient failures with exponential backoff.
+
+    Waits use ``await asyncio.sleep`` so the event loop keeps serving other
+    tasks. The delay before retry n (0-based) is ``min(cap, base * 2**n)``
+    scaled by a random 0.5-1.5 jitter factor.
+
+    Args:
+        fn: Zero-argument coroutine function, called once per attempt
+        retries: Number of retries after the first attempt
+        base: Delay before the first retry, in seconds
+        cap: Maximum delay between attempts, in seconds
+        exceptions: Exception types that are retried (others propagate at once)
+        description: Name of the operation for log messages
+
+    Returns:
+        The result of the first successful attempt
+
+    Raises:
+        Exception: The last error once all retries are used up
+    """
+    attempts = retries + 1
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except exceptions as e:
+            if attempt == attempts - 1:
+                raise
+            delay = min(cap, base * 2 ** attempt) * (0.5 + random.random())
+            logger.warning(
+                "Transient error in %s (attempt %d/%d), retrying in %.1fs: %s",
+                description, attempt + 1, attempts, delay, e,
+            )
+            await asyncio.sleep(delay)
@@ -84,7 +84,7 @@ def get_unique_order_dir(base_dir: str, email: str, pet_name: str, timestamp: st
         base_dir: Base directory for backups (e.g., "temp")
         email: User email address
         pet_name: Pet's name
-        timestamp: Optional timestamp string (YYYYMMDD_HHMMSS format).
+        timestamp: Optional timestamp string (e.g. YYYYMMDD_HHMMSS).
                    If None, generates current timestamp.
         
     Returns:
@@ -3,15 +3,16 @@
 import hashlib
 import logging
 import os
-import time
+import shutil
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
 from typing import List
 
 from app.core.config import settings
-from app.services.email_service import EmailService
-from app.services.gemini_service import GeminiGenerator
-from app.services.pdf_service import PDFService
+from app.core.services import get_email_service, get_gemini_service, get_pdf_service
+from app.services.email_service import EmailJob
+from app.services.gemini_service import run_sync
 from app.services.web_generator import WebGenerator
 
 logger = logging.getLogger(__name__)
@@ -35,7 +36,10 @@ def process_pet_story(
         pet_story: Pet's story/biography
         email: User email address
         order_temp_dir: Directory where files for this order will be saved
-        photo_data_list: List of dicts with photo data: {"bytes": bytes, "filename": str, "original_filename": str}
+        photo_data_list: List of dicts with photo data:
+            {"file": file object, "size": int, "mime_type": str, "filename": str,
+            "original_filename": str}.
+            Every file is closed once the photos are saved, even if saving fails.
         timestamp: Timestamp string for this order
         
     Returns:
@@ -44,24 +48,29 @@ def process_pet_story(
     print(f"🚀 Iniciando processamento da história de {nome_pet} com {len(photo_data_list)} foto(s)...")
     
     try:
-        # Ensure order directory exists
-        Path(order_temp_dir).mkdir(parents=True, exist_ok=True)
-        
-        # Step 0: Save photos to disk (they were only in memory before)
-        print(f"💾 Salvando {len(photo_data_list)} foto(s) no disco...")
-        photo_paths = []
-        for idx, photo_data in enumerate(photo_data_list, 1):
-            photo_path = os.path.join(order_temp_dir, photo_data["filename"])
-            with open(photo_path, "wb") as f:
-                f.write(photo_data["bytes"])
-            photo_paths.append(photo_path)
-            print(f"  ✅ Foto {idx} salva: {photo_data['original_filename']} -> {photo_path}")
+        with ExitStack() as photo_files:
+            # Close every spooled upload, including the ones not reached if a step below fails
+            for photo_data in photo_data_list:
+                photo_files.callback(photo_data["file"].close)
+            
+            # Ensure order directory exists
+            Path(order_temp_dir).mkdir(parents=True, exist_ok=True)
+            
+            # Step 0: Save photos to disk (they were only spooled before)
+            print(f"💾 Salvando {len(photo_data_list)} foto(s) no disco...")
+            photo_paths = []
+            for idx, photo_data in enumerate(photo_data_list, 1):
+                photo_path = f"{order_temp_dir}/{photo_data['filename']}"
+                with photo_data["file"] as src, open(photo_path, "wb") as f:
+                    shutil.copyfileobj(src, f)
+                photo_paths.append(photo_path)
+                print(f"  ✅ Foto {idx} salva: {photo_data['original_filename']} -> {photo_path}")
         
         # Initialize services
-        gemini_service = GeminiGenerator()
-        pdf_service = PDFService()
+        gemini_service = get_gemini_service()
+        pdf_service = get_pdf_service()
         web_generator = WebGenerator()
-        email_service = EmailService()
+        email_service = get_email_service()
         
         # Use order temp directory for all files
         user_temp_dir = order_temp_dir
@@ -70,23 +79,15 @@ def process_pet_story(
         print(f"📸 Passo 1/4: Gerando arte com IA para {len(photo_paths)} foto(s)...")
         generated_arts = []
         
-        for idx, photo_path in enumerate(photo_paths, 1):
-            try:
-                print(f"  🎨 Processando foto {idx}/{len(photo_paths)}: {os.path.basename(photo_path)}")
-                art_path = gemini_service.generate_art(photo_path, output_dir=user_temp_dir)
-                generated_arts.append(art_path)
-                print(f"  ✅ Arte {idx} gerada: {art_path}")
-                
-                # Sleep between generations to avoid rate limit (except for last one)
-                if idx < len(photo_paths):
-                    print(f"  ⏳ Aguardando 2 segundos antes da próxima geração...")
-                    time.sleep(2)
-                    
-            except Exception as e:
-                print(f"  ❌ Erro ao gerar arte para foto {idx}: {str(e)}")
-                logger.error(f"Error generating art for photo {idx}: {e}", exc_info=True)
-                # Continue processing other photos
+        art_results = run_sync(gemini_service.generate_arts, photo_paths, user_temp_dir)
+        for idx, (photo_path, result) in enumerate(zip(photo_paths, art_results), 1):
+            if isinstance(result, BaseException):
+                print(f"  ❌ Erro ao gerar arte para foto {idx}: {str(result)}")
+                logger.error(f"Error generating art for photo {idx}: {result}", exc_info=result)
+                # Continue with the other photos
                 continue
+            generated_arts.append(result)
+            print(f"  ✅ Arte {idx} gerada ({os.path.basename(photo_path)}): {result}")
         
         if not generated_arts:
             raise Exception("Nenhuma arte foi gerada com sucesso. Verifique os logs para mais detalhes.")
@@ -101,23 +102,15 @@ def process_pet_story(
         # For now, generate stickers from all photos (or limit to first 3 to save costs)
         sticker_photos = photo_paths[:3] if len(photo_paths) > 3 else photo_paths
         
-        for idx, photo_path in enumerate(sticker_photos, 1):
-            try:
-                print(f"  🎨 Gerando adesivo {idx}/{len(sticker_photos)}: {os.path.basename(photo_path)}")
-                sticker_path = gemini_service.generate_sticker(photo_path, output_dir=user_temp_dir)
-                generated_stickers.append(sticker_path)
-                print(f"  ✅ Adesivo {idx} gerado: {sticker_path}")
-                
-                # Sleep between generations to avoid rate limit (except for last one)
-                if idx < len(sticker_photos):
-                    print(f"  ⏳ Aguardando 2 segundos antes da próxima geração de adesivo...")
-                    time.sleep(2)
-                    
-            except Exception as e:
-                print(f"  ❌ Erro ao gerar adesivo para foto {idx}: {str(e)}")
-                logger.error(f"Error generating sticker for photo {idx}: {e}", exc_info=True)
-                # Continue processing other photos
+        sticker_results = run_sync(gemini_service.generate_stickers, sticker_photos, user_temp_dir)
+        for idx, (photo_path, result) in enumerate(zip(sticker_photos, sticker_results), 1):
+            if isinstance(result, BaseException):
+                print(f"  ❌ Erro ao gerar adesivo para foto {idx}: {str(result)}")
+                logger.error(f"Error generating sticker for photo {idx}: {result}", exc_info=result)
+                # Continue with the other photos
                 continue
+            generated_stickers.append(result)
+            print(f"  ✅ Adesivo {idx} gerado ({os.path.basename(photo_path)}): {result}")
         
         # If no stickers were generated, use arts as fallback
         if not generated_stickers:
@@ -194,15 +187,19 @@ def process_pet_story(
         # Step 4: Send email with PDF and HTML
         print(f"📧 Passo 4/4: Enviando e-mail para {email}...")
         email_sent = False
-        try:
-            # Read PDF bytes
-            with open(pdf_path, "rb") as f:
-                pdf_bytes = f.read()
+        email_queued = False
+        if not email_service.enabled:
+            # Nothing would be sent - skip reading the PDF back into memory
+            print(f"⚠️ E-mail não configurado (SMTP) - envio ignorado")
+            logger.warning(f"Email service not configured - skipping email to {email} for {nome_pet}")
+        else:
+            try:
+                # Read PDF bytes
+                with open(pdf_path, "rb") as f:
+                    pdf_bytes = f.read()
             
-            # Send email with attachments
-            import asyncio
-            email_sent = asyncio.run(
-                email_service.send_pet_story_email(
+                # Hand the email to the app's send queue; send inline if it isn't running
+                email_job = EmailJob(
                     to_email=email,
                     pet_name=nome_pet,
                     pdf_bytes=pdf_bytes,
@@ -210,19 +207,34 @@ def process_pet_story(
                     pdf_filename=os.path.basename(pdf_path),
                     homenagem_url=homenagem_url,  # Pass URL for QR code in email
                 )
-            )
-            
-            if email_sent:
-                print(f"✅ E-mail enviado com sucesso!")
-                logger.info(f"Email sent successfully to {email} for {nome_pet}")
-            else:
-                print(f"⚠️ Falha ao enviar e-mail - verifique logs/email.log para detalhes")
-                logger.warning(f"Failed to send email to {email} for {nome_pet} - check logs/email.log")
-        except Exception as e:
-            error_msg = f"Erro ao enviar e-mail: {str(e)}"
-            print(f"❌ {error_msg}")
-            logger.error(error_msg, exc_info=True)
-            # Não levanta exceção - continua e retorna resultado indicando falha no email
+                if email_service.enqueue_pet_story_email(email_job):
+                    # Delivery happens later; the queue logs whether it succeeded
+                    email_queued = True
+                    print(f"📬 E-mail enfileirado para envio")
+                    logger.info(f"Email queued for {email} for {nome_pet}")
+                else:
+                    import asyncio
+                    email_sent = asyncio.run(
+                        email_service.send_pet_story_email(
+                            to_email=email_job.to_email,
+                            pet_name=email_job.pet_name,
+                            pdf_bytes=email_job.pdf_bytes,
+                            html_content=email_job.html_content,
+                            pdf_filename=email_job.pdf_filename,
+                            homenagem_url=email_job.homenagem_url,
+                        )
+                    )
+                    if email_sent:
+                        print(f"✅ E-mail enviado com sucesso!")
+                        logger.info(f"Email sent successfully to {email} for {nome_pet}")
+                    else:
+                        print(f"⚠️ Falha ao enviar e-mail - verifique logs/email.log para detalhes")
+                        logger.warning(f"Failed to send email to {email} for {nome_pet} - check logs/email.log")
+            except Exception as e:
+                error_msg = f"Erro ao enviar e-mail: {str(e)}"
+                print(f"❌ {error_msg}")
+                logger.error(error_msg, exc_info=True)
+                # Não levanta exceção - continua e retorna resultado indicando falha no email
         
         print(f"🎉 Processamento completo para {nome_pet}!")
         return {
@@ -239,6 +251,7 @@ def process_pet_story(
             "homenagem_url": homenagem_url,  # URL pública do site
             "homenagem_id": homenagem_id,  # ID único da homenagem
             "email_sent": email_sent,
+            "email_queued": email_queued,
         }
         
     except Exception as e:
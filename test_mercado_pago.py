@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Script para testar a integração com Mercado Pago."""
 
+import asyncio
 import sys
 import os
 
@@ -63,13 +64,13 @@ def test_create_preference(service):
     print()
     
     try:
-        result = service.create_payment_preference(
+        result = asyncio.run(service.create_payment_preference(
             email="teste@exemplo.com",
             pet_name="PetTeste",
             success_url=f"{settings.API_BASE_URL}/api/payment/success",
             failure_url=f"{settings.API_BASE_URL}/api/payment/failure",
             pending_url=f"{settings.API_BASE_URL}/api/payment/pending"
-        )
+        ))
         
         print("✅ Preferência criada com sucesso!")
         print(f"   ID: {result.get('id')}")
@@ -0,0 +1,396 @@
+"""Tests for EmailService."""
+
+import asyncio
+import email
+import os
+import re
+import smtplib
+import socket
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.email_service import (
+    EmailJob,
+    EmailService,
+    _CachedDNSSMTP,
+    _SMTPPool,
+    _dns_cache,
+    _encode_attachment,
+    _is_transient_smtp_error,
+    _pdf_attachment_part,
+    _stream_message,
+)
+
+
+class FakeSMTP:
+    """In-memory stand-in for a connected smtplib.SMTP session.
+
+    Records the commands and raw bytes written, and answers every command
+    with the success code the client expects.
+    """
+
+    def __init__(self, extensions=()):
+        self.extensions = set(extensions)
+        self.commands = []
+        self.mail_options = None
+        self.sent = []
+        self._replies = []
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def has_extn(self, name):
+        return name in self.extensions
+
+    def mail(self, sender, options=()):
+        self.mail_options = list(options)
+        return 250, b"OK"
+
+    def rcpt(self, recipient):
+        return 250, b"OK"
+
+    def putcmd(self, cmd, args=""):
+        self.commands.append((cmd, args))
+        self._replies.append((354, b"Go ahead") if cmd == "data" else (250, b"OK"))
+
+    def send(self, data):
+        self.sent.append(bytes(data))
+
+    def getreply(self):
+        # Replies to commands first, then to the end of the message data
+        return self._replies.pop(0) if self._replies else (250, b"OK")
+
+
+def _build_message(pdf_filename="kit.pdf"):
+    """Build a message whose plain text parts (around the PDF) start lines with '.'."""
+    msg = MIMEMultipart("mixed")
+    msg["Subject"] = "Kit"
+    msg.attach(MIMEText("Ola!\n.linha com ponto\n", "plain"))
+    msg.attach(_pdf_attachment_part(pdf_filename))
+    msg.attach(MIMEText(".rodape\n", "plain"))
+    return msg
+
+
+def _attachment_from(raw: bytes) -> bytes:
+    """Parse a received message and return the decoded PDF attachment."""
+    parsed = email.message_from_bytes(raw)
+    for part in parsed.walk():
+        if part.get_content_type() == "application/pdf":
+            return part.get_payload(decode=True)
+    raise AssertionError("no PDF attachment in message")
+
+
+@pytest.fixture
+def email_job():
+    """Create a queued pet story email."""
+    return EmailJob(
+        to_email="tutor@example.com",
+        pet_name="Spike",
+        pdf_bytes=b"%PDF-1.4 test",
+        html_content="<html></html>",
+    )
+
+
+class TestEmailQueue:
+    """Test suite for the background send queue."""
+
+    @pytest.fixture
+    def service(self):
+        """Create an SMTP-enabled service (no connection is opened)."""
+        return EmailService(smtp_user="user", smtp_password="secret")
+
+    @pytest.mark.asyncio
+    async def test_stop_delivers_scheduled_retries(self, service, email_job):
+        """Test stop() sends pending retries instead of dropping them."""
+        send = AsyncMock(side_effect=[(False, True), (True, False)])
+        with patch.object(service, "_send_pet_story_email", send):
+            await service.start(workers=1)
+            assert service.enqueue_pet_story_email(email_job)
+            # Let the first attempt fail and schedule its (2s) retry
+            while send.await_count < 1 or not service._retries:
+                await asyncio.sleep(0)
+
+            await asyncio.wait_for(service.stop(timeout=5), 1)
+
+        assert send.await_count == 2
+        assert not service._retries
+
+    @pytest.mark.asyncio
+    async def test_stop_logs_jobs_left_after_timeout(self, service, email_job):
+        """Test jobs still pending when the drain times out are logged as dropped."""
+        blocked = asyncio.Event()
+
+        async def never_finishes(**kwargs):
+            await blocked.wait()
+
+        with patch.object(service, "_send_pet_story_email", side_effect=never_finishes):
+            await service.start(workers=1)
+            service.enqueue_pet_story_email(email_job)
+            service.enqueue_pet_story_email(email_job)
+            await asyncio.sleep(0)
+
+            with patch("app.services.email_service.logger") as mock_logger:
+                await service.stop(timeout=0.05)
+
+        messages = " ".join(str(call.args) for call in mock_logger.error.call_args_list)
+        assert "dropped on shutdown" in messages
+        assert "tutor@example.com" in messages
+        assert service._queue is None
+
+    @pytest.mark.asyncio
+    async def test_permanent_failure_is_not_retried(self, service, email_job):
+        """Test a failure the server won't change its mind about is not re-queued."""
+        send = AsyncMock(return_value=(False, False))
+        with patch.object(service, "_send_pet_story_email", send):
+            await service.start(workers=1)
+            service.enqueue_pet_story_email(email_job)
+            await asyncio.wait_for(service._queue.join(), 1)
+
+            assert not service._retries
+            await service.stop(timeout=1)
+
+        assert send.await_count == 1
+        assert email_job.attempts == 0
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (smtplib.SMTPServerDisconnected("gone"), True),
+        (TimeoutError("timed out"), True),
+        (ConnectionRefusedError("refused"), True),
+        (smtplib.SMTPDataError(451, b"try again later"), True),
+        (smtplib.SMTPDataError(554, b"rejected"), False),
+        (smtplib.SMTPAuthenticationError(535, b"bad credentials"), False),
+        (smtplib.SMTPRecipientsRefused({"a@example.com": (452, b"mailbox full")}), True),
+        (smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"no such user")}), False),
+        (ValueError("bad message"), False),
+    ],
+)
+def test_is_transient_smtp_error(error, transient):
+    """Test only dropped connections, timeouts and 4xx replies are retryable."""
+    assert _is_transient_smtp_error(error) is transient
+
+
+class TestSendPdfBatch:
+    """Test suite for sending one PDF to many recipients."""
+
+    @pytest.fixture
+    def service(self):
+        """Create an SMTP-enabled service whose pool hands out a stub connection."""
+        service = EmailService(smtp_user="user", smtp_password="secret")
+        service._pool = MagicMock()
+        service._pool.acquire.return_value.__enter__.return_value = MagicMock(spec=smtplib.SMTP)
+        return service
+
+    def _conn(self, service):
+        return service._pool.acquire.return_value.__enter__.return_value
+
+    @pytest.mark.asyncio
+    async def test_rejected_message_does_not_fail_other_recipients(self, service):
+        """Test a refused message only marks its own recipient as failed."""
+        self._conn(service).sendmail.side_effect = [{}, smtplib.SMTPDataError(554, b"rejected"), {}]
+
+        results = await service.send_pdf_batch(["a@x.com", "b@x.com", "c@x.com"], "Kit", b"%PDF")
+
+        assert results == [True, False, True]
+
+    @pytest.mark.asyncio
+    async def test_dropped_connection_keeps_delivered_results(self, service):
+        """Test recipients sent before the connection dropped stay True."""
+        self._conn(service).sendmail.side_effect = [{}, smtplib.SMTPServerDisconnected("gone")]
+
+        results = await service.send_pdf_batch(["a@x.com", "b@x.com", "c@x.com"], "Kit", b"%PDF")
+
+        assert results == [True, False, False]
+
+
+class TestStreamMessage:
+    """Test suite for the hand-written SMTP DATA/BDAT exchange."""
+
+    @pytest.fixture
+    def pdf_bytes(self):
+        """Random attachment large enough to span several base64 chunks."""
+        return os.urandom(150 * 1024)
+
+    def _received_data(self, server):
+        """Undo DATA framing: check the terminator and remove dot-stuffing."""
+        data = b"".join(server.sent)
+        assert data.endswith(b"\r\n.\r\n")
+        return re.sub(rb"(?m)^\.\.", b".", data[:-3])
+
+    def test_data_streams_attachment(self, pdf_bytes):
+        """Test the DATA path dot-stuffs text lines and the PDF decodes intact."""
+        server = FakeSMTP()
+
+        refused = _stream_message(server, "from@example.com", "to@example.com", _build_message(), pdf_bytes)
+
+        assert refused == {}
+        assert server.commands == [("data", "")]
+        assert server.mail_options == []
+        sent = b"".join(server.sent)
+        assert b"\r\n..linha com ponto\r\n" in sent
+        assert b"\r\n..rodape\r\n" in sent
+        raw = self._received_data(server)
+        # The last base64 line's CRLF is followed directly by the next boundary
+        assert _encode_attachment(pdf_bytes) + b"--" in raw
+        assert _attachment_from(raw) == pdf_bytes
+
+    def test_data_uses_pre_encoded_attachment(self, pdf_bytes):
+        """Test a retry's pre-encoded base64 is sent as is instead of re-encoding."""
+        server = FakeSMTP()
+        encoded = _encode_attachment(pdf_bytes)
+
+        with patch("app.services.email_service._iter_base64_lines") as iter_lines:
+            _stream_message(
+                server, "from@example.com", "to@example.com", _build_message(), pdf_bytes,
+                attachment_base64=encoded,
+            )
+
+        iter_lines.assert_not_called()
+        assert encoded in server.sent
+        assert _attachment_from(self._received_data(server)) == pdf_bytes
+
+    def test_bdat_sends_raw_pdf_in_chunks(self):
+        """Test CHUNKING + BINARYMIME servers get the raw PDF over BDAT, 1 MiB at a time."""
+        server = FakeSMTP(extensions={"chunking", "binarymime"})
+        pdf_bytes = os.urandom(2 * 1024 * 1024 + 1000)
+
+        _stream_message(server, "from@example.com", "to@example.com", _build_message(), pdf_bytes)
+
+        assert server.mail_options == ["BODY=BINARYMIME"]
+        assert [cmd for cmd, _ in server.commands] == ["bdat"] * 5
+        sizes = [args.split()[0] for _, args in server.commands]
+        assert sizes[1:4] == [str(1024 * 1024), str(1024 * 1024), "1000"]
+        assert [args.split()[1:] for _, args in server.commands] == [[], [], [], [], ["LAST"]]
+        # Each BDAT announces exactly the bytes sent after it
+        assert [int(size) for size in sizes] == [len(data) for data in server.sent]
+        raw = b"".join(server.sent)
+        assert b"Content-Transfer-Encoding: binary" in raw
+        assert _attachment_from(raw) == pdf_bytes
+
+
+class TestSMTPPool:
+    """Test suite for the pooled SMTP connections."""
+
+    @pytest.fixture
+    def connections(self):
+        """Replace the SMTP client with stubs; yields the list of stubs created."""
+        created = []
+
+        def connect(*args, **kwargs):
+            conn = MagicMock(spec=smtplib.SMTP)
+            conn.noop.return_value = (250, b"OK")
+            created.append(conn)
+            return conn
+
+        with patch("app.services.email_service._CachedDNSSMTP", side_effect=connect):
+            yield created
+
+    def _pool(self, **kwargs):
+        """Create a pool for a test account."""
+        return _SMTPPool("smtp.example.com", 587, "user", "secret", **kwargs)
+
+    def test_reuses_live_connection(self, connections):
+        """Test a healthy connection is logged in once and reused."""
+        pool = self._pool()
+
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+
+        assert first is second
+        assert len(connections) == 1
+        first.login.assert_called_once_with("user", "secret")
+
+    def test_replaces_connection_when_noop_fails(self, connections):
+        """Test a connection the server dropped is closed and replaced."""
+        pool = self._pool()
+        with pool.acquire() as first:
+            pass
+        first.noop.side_effect = smtplib.SMTPServerDisconnected("gone")
+
+        with pool.acquire() as second:
+            pass
+
+        assert second is not first
+        first.quit.assert_called_once()
+
+    def test_expires_idle_connections(self, connections):
+        """Test a connection idle for longer than idle_ttl is not reused."""
+        pool = self._pool(idle_ttl=60.0)
+        clock = [1000.0]
+        with patch("app.services.email_service.time.monotonic", side_effect=lambda: clock[0]):
+            with pool.acquire() as first:
+                pass
+            clock[0] += 61.0
+            with pool.acquire() as second:
+                pass
+
+        assert second is not first
+        first.noop.assert_not_called()
+        first.quit.assert_called_once()
+
+    def test_retires_connection_after_message_limit(self, connections):
+        """Test a connection is closed once it sent max_messages_per_connection messages."""
+        pool = self._pool(max_messages_per_connection=2)
+
+        used = []
+        for _ in range(3):
+            with pool.acquire() as conn:
+                used.append(conn)
+
+        assert used[0] is used[1]
+        assert used[2] is not used[0]
+        used[0].quit.assert_called_once()
+
+    def test_discards_connection_that_raised(self, connections):
+        """Test a connection whose block raised is closed instead of pooled."""
+        pool = self._pool()
+
+        with pytest.raises(smtplib.SMTPDataError):
+            with pool.acquire() as first:
+                raise smtplib.SMTPDataError(554, b"rejected")
+        with pool.acquire() as second:
+            pass
+
+        assert second is not first
+        first.quit.assert_called_once()
+
+    def test_keeps_at_most_max_size_idle(self, connections):
+        """Test connections beyond max_size are closed when released."""
+        pool = self._pool(max_size=1)
+
+        with pool.acquire() as first, pool.acquire() as second:
+            pass
+
+        assert first is not second
+        assert len(pool._idle) == 1
+        closed = [conn for conn in (first, second) if conn.quit.called]
+        assert len(closed) == 1
+
+
+def test_cached_dns_smtp_falls_back_to_next_address():
+    """Test connecting tries every resolved address, not just the first one."""
+    infos = [
+        (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2001:db8::1", 587, 0, 0)),
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 587)),
+    ]
+    unreachable, reachable = MagicMock(), MagicMock()
+    unreachable.connect.side_effect = OSError("Network is unreachable")
+    _dns_cache.clear()
+
+    with patch("app.services.email_service.socket.getaddrinfo", return_value=infos) as getaddrinfo, \
+            patch("app.services.email_service.socket.socket", side_effect=[unreachable, reachable]):
+        sock = _CachedDNSSMTP()._get_socket("smtp.example.com", 587, 30)
+
+    assert sock is reachable
+    unreachable.close.assert_called_once()
+    reachable.connect.assert_called_once_with(("192.0.2.1", 587))
+    getaddrinfo.assert_called_once()
+    assert _dns_cache["smtp.example.com"][1] == infos
+    _dns_cache.clear()
@@ -1,18 +1,29 @@
 """Tests for GeminiGenerator service."""
 
+import asyncio
 import io
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import google.generativeai as genai
 import pytest
+from google.api_core import exceptions as google_exceptions
 from PIL import Image
 
-from app.services.gemini_service import GeminiGenerator, BOBBIE_GOODS_PROMPT
+from app.services.gemini_cache import GeminiCache
+from app.services.gemini_service import GeminiGenerator, BOBBIE_GOODS_PROMPT, run_sync
 
 
 class TestGeminiGenerator:
     """Test suite for GeminiGenerator."""
 
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, temp_dir):
+        """Give every test its own empty response cache."""
+        cache = GeminiCache(cache_dir=os.path.join(temp_dir, "gemini_cache"))
+        with patch("app.services.gemini_service.get_gemini_cache", return_value=cache):
+            yield cache
+
     @pytest.fixture
     def mock_gemini_response(self):
         """Create a mock Gemini API response with image data."""
@@ -22,14 +33,16 @@ class TestGeminiGenerator:
         test_image.save(buffer, format="PNG")
         image_bytes = buffer.getvalue()
         
-        # Create mock response structure
-        mock_part = MagicMock()
-        mock_part.inline_data = MagicMock()
-        mock_part.inline_data.mime_type = "image/png"
-        mock_part.inline_data.data = image_bytes
-        
-        mock_candidate = MagicMock()
-        mock_candidate.content.parts = [mock_part]
+        # Create mock response structure (candidates are real protos, as in the SDK)
+        mock_candidate = genai.protos.Candidate(
+            content=genai.protos.Content(
+                parts=[
+                    genai.protos.Part(
+                        inline_data=genai.protos.Blob(mime_type="image/png", data=image_bytes)
+                    )
+                ]
+            )
+        )
         
         mock_response = MagicMock()
         mock_response.candidates = [mock_candidate]
@@ -60,8 +73,8 @@ class TestGeminiGenerator:
         with patch("app.services.gemini_service.genai.configure"):
             with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
                 mock_model = MagicMock()
-                # generate_content is called synchronously (no await), so return value directly
-                mock_model.generate_content = MagicMock(return_value=mock_gemini_response)
+                # generate_content_async is awaited, so it must be an AsyncMock
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
                 mock_model_class.return_value = mock_model
                 
                 generator = GeminiGenerator(api_key="test-key")
@@ -74,6 +87,56 @@ class TestGeminiGenerator:
                 img = Image.open(io.BytesIO(result))
                 assert img.format == "PNG"
 
+    @pytest.mark.asyncio
+    async def test_generate_returns_rgb_png_unchanged(self, sample_image_bytes, mock_gemini_response):
+        """Test that an RGB PNG from the API is returned without re-encoding."""
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key")
+                result = await generator.generate(sample_image_bytes, "test prompt")
+                
+                part = mock_gemini_response.candidates[0].content.parts[0]
+                assert result == part.inline_data.data
+
+    @pytest.mark.asyncio
+    async def test_generate_sends_original_image_bytes(self, sample_image_bytes, mock_gemini_response):
+        """Test that supported input images are sent without re-encoding."""
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key")
+                await generator.generate(sample_image_bytes, "test prompt")
+                
+                contents = mock_model.generate_content_async.call_args.args[0]
+                assert contents[1] == {"mime_type": "image/png", "data": sample_image_bytes}
+
+    @pytest.mark.asyncio
+    async def test_generate_shrinks_oversized_input(self, mock_gemini_response):
+        """Test that large photos are downscaled to JPEG before upload."""
+        large_image = Image.new("RGB", (4000, 3000), color="blue")
+        buffer = io.BytesIO()
+        large_image.save(buffer, format="JPEG")
+        
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key")
+                await generator.generate(buffer.getvalue(), "test prompt")
+                
+                sent = mock_model.generate_content_async.call_args.args[0][1]
+                assert sent["mime_type"] == "image/jpeg"
+                assert Image.open(io.BytesIO(sent["data"])).size == (1536, 1152)
+
     @pytest.mark.asyncio
     async def test_generate_with_rgb_conversion(self, sample_image_bytes, mock_gemini_response):
         """Test that non-RGB images are converted to RGB."""
@@ -86,7 +149,7 @@ class TestGeminiGenerator:
         with patch("app.services.gemini_service.genai.configure"):
             with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
                 mock_model = MagicMock()
-                mock_model.generate_content = MagicMock(return_value=mock_gemini_response)
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
                 mock_model_class.return_value = mock_model
                 
                 generator = GeminiGenerator(api_key="test-key")
@@ -106,7 +169,7 @@ class TestGeminiGenerator:
         with patch("app.services.gemini_service.genai.configure"):
             with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
                 mock_model = MagicMock()
-                mock_model.generate_content = MagicMock(return_value=mock_response)
+                mock_model.generate_content_async = AsyncMock(return_value=mock_response)
                 mock_model_class.return_value = mock_model
                 
                 generator = GeminiGenerator(api_key="test-key")
@@ -114,13 +177,53 @@ class TestGeminiGenerator:
                 with pytest.raises(ValueError, match="No image generated"):
                     await generator.generate(sample_image_bytes, "test prompt")
 
+    @pytest.mark.asyncio
+    async def test_generate_with_text_refusal(self, sample_image_bytes):
+        """Test that a text-only answer fails with the model's message."""
+        mock_response = MagicMock()
+        mock_response.candidates = [
+            genai.protos.Candidate(
+                content=genai.protos.Content(parts=[genai.protos.Part(text="I can't help with that.")])
+            )
+        ]
+        
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(return_value=mock_response)
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key")
+                
+                with pytest.raises(ValueError, match="I can't help with that"):
+                    await generator.generate(sample_image_bytes, "test prompt")
+
+    @pytest.mark.asyncio
+    async def test_generate_retries_transient_errors(self, sample_image_bytes, mock_gemini_response):
+        """Test that rate limit errors are retried before giving up."""
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(
+                    side_effect=[google_exceptions.ResourceExhausted("quota"), mock_gemini_response]
+                )
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key")
+                with patch("app.services.gemini_service.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+                    result = await generator.generate(sample_image_bytes, "test prompt")
+                
+                assert Image.open(io.BytesIO(result)).format == "PNG"
+                assert mock_model.generate_content_async.call_count == 2
+                mock_sleep.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_generate_handles_api_error(self, sample_image_bytes):
         """Test generation handles API errors gracefully."""
         with patch("app.services.gemini_service.genai.configure"):
             with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
                 mock_model = MagicMock()
-                mock_model.generate_content = MagicMock(side_effect=Exception("API Error"))
+                mock_model.generate_content_async = AsyncMock(side_effect=Exception("API Error"))
                 mock_model_class.return_value = mock_model
                 
                 generator = GeminiGenerator(api_key="test-key")
@@ -128,16 +231,17 @@ class TestGeminiGenerator:
                 with pytest.raises(Exception):
                     await generator.generate(sample_image_bytes, "test prompt")
 
-    def test_generate_art_success(self, temp_dir, sample_image_path, mock_gemini_response):
+    @pytest.mark.asyncio
+    async def test_generate_art_success(self, temp_dir, sample_image_path, mock_gemini_response):
         """Test generate_art method saves image to disk."""
         with patch("app.services.gemini_service.genai.configure"):
             with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
                 mock_model = MagicMock()
-                mock_model.generate_content = MagicMock(return_value=mock_gemini_response)
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
                 mock_model_class.return_value = mock_model
                 
                 generator = GeminiGenerator(api_key="test-key")
-                output_path = generator.generate_art(sample_image_path, output_dir=temp_dir)
+                output_path = await generator.generate_art(sample_image_path, output_dir=temp_dir)
                 
                 # Verify file was created
                 assert os.path.exists(output_path)
@@ -147,24 +251,86 @@ class TestGeminiGenerator:
                 img = Image.open(output_path)
                 assert img.format == "PNG"
 
-    def test_generate_art_uses_default_output_dir(self, sample_image_path, mock_gemini_response):
+    @pytest.mark.asyncio
+    async def test_generate_art_uses_default_output_dir(self, sample_image_path, mock_gemini_response):
         """Test generate_art uses photo directory when output_dir is None."""
         photo_dir = os.path.dirname(sample_image_path)
         
         with patch("app.services.gemini_service.genai.configure"):
             with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
                 mock_model = MagicMock()
-                mock_model.generate_content = MagicMock(return_value=mock_gemini_response)
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
                 mock_model_class.return_value = mock_model
                 
                 generator = GeminiGenerator(api_key="test-key")
-                output_path = generator.generate_art(sample_image_path, output_dir=None)
+                output_path = await generator.generate_art(sample_image_path, output_dir=None)
                 
                 # Should save in same directory as photo
                 assert os.path.dirname(output_path) == photo_dir
                 assert os.path.exists(output_path)
 
-    def test_generate_art_handles_file_error(self, temp_dir):
+    @pytest.mark.asyncio
+    async def test_generate_uses_cache(self, sample_image_bytes, mock_gemini_response, isolated_cache):
+        """Test that identical requests only call the API once."""
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key")
+                first = await generator.generate(sample_image_bytes, "test prompt")
+                second = await generator.generate(sample_image_bytes, "test prompt")
+                
+                assert first == second
+                mock_model.generate_content_async.assert_called_once()
+                
+                # A fresh cache instance on the same directory reads it from disk
+                disk_cache = GeminiCache(cache_dir=str(isolated_cache.cache_dir))
+                key = disk_cache.make_key(sample_image_bytes, "test prompt", generator.model_name)
+                assert disk_cache.get(key) == first
+
+    @pytest.mark.asyncio
+    async def test_generate_coalesces_concurrent_duplicates(self, sample_image_bytes, mock_gemini_response):
+        """Test that identical requests in flight at once share one API call."""
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(return_value=mock_gemini_response)
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key", cache=GeminiCache())
+                results = await asyncio.gather(
+                    generator.generate(sample_image_bytes, "test prompt"),
+                    generator.generate(sample_image_bytes, "test prompt"),
+                )
+                
+                assert results[0] == results[1]
+                mock_model.generate_content_async.assert_called_once()
+                assert generator._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_keeps_order_and_errors(self, sample_image_bytes, mock_gemini_response):
+        """Test generate_batch returns one result per input, failures included."""
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model = MagicMock()
+                mock_model.generate_content_async = AsyncMock(
+                    side_effect=[mock_gemini_response, Exception("API Error")]
+                )
+                mock_model_class.return_value = mock_model
+                
+                generator = GeminiGenerator(api_key="test-key")
+                results = await generator.generate_batch(
+                    [sample_image_bytes, b"not an image"], "test prompt", concurrency=1
+                )
+                
+                assert len(results) == 2
+                assert Image.open(io.BytesIO(results[0])).format == "PNG"
+                assert isinstance(results[1], Exception)
+
+    @pytest.mark.asyncio
+    async def test_generate_art_handles_file_error(self, temp_dir):
         """Test generate_art handles missing photo file."""
         fake_photo_path = os.path.join(temp_dir, "nonexistent.jpg")
         
@@ -173,7 +339,32 @@ class TestGeminiGenerator:
                 generator = GeminiGenerator(api_key="test-key")
                 
                 with pytest.raises(Exception):
-                    generator.generate_art(fake_photo_path, output_dir=temp_dir)
+                    await generator.generate_art(fake_photo_path, output_dir=temp_dir)
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_only_own_clients(self):
+        """Test aclose leaves the SDK's shared clients alone and detaches its own."""
+        own_client = MagicMock()
+        own_client.transport.close = AsyncMock()
+        shared_client = MagicMock()
+        
+        with patch("app.services.gemini_service.genai.configure"):
+            with patch("app.services.gemini_service.genai.GenerativeModel") as mock_model_class:
+                mock_model_class.return_value = MagicMock(_client=shared_client, _async_client=None)
+                generator = GeminiGenerator(api_key="test-key")
+                with patch(
+                    "app.services.gemini_service.genai_client._client_manager.make_client",
+                    return_value=own_client,
+                ):
+                    generator._own_client("_client", "generative")
+                    generator._own_client("_async_client", "generative_async")
+                
+                await generator.aclose()
+                
+                own_client.transport.close.assert_awaited_once()
+                shared_client.transport.close.assert_not_called()
+                assert generator.model._async_client is None
+                assert generator.model._client is shared_client
 
     def test_bobbie_goods_prompt_defined(self):
         """Test that BOBBIE_GOODS_PROMPT is defined and not empty."""
@@ -181,3 +372,43 @@ class TestGeminiGenerator:
         assert len(BOBBIE_GOODS_PROMPT) > 0
         assert "coloring book" in BOBBIE_GOODS_PROMPT.lower() or "line art" in BOBBIE_GOODS_PROMPT.lower()
 
+
+def test_run_sync_outside_app_reuses_one_loop():
+    """Test run_sync without an app loop runs every call on the same live loop."""
+    async def current_loop(value):
+        return asyncio.get_running_loop(), value
+    
+    first_loop, first = run_sync(current_loop, 1)
+    second_loop, second = run_sync(current_loop, 2)
+    
+    assert (first, second) == (1, 2)
+    assert first_loop is second_loop
+    assert first_loop.is_running()
+
+
+class TestGeminiCache:
+    """Test suite for GeminiCache size limits."""
+
+    def test_memory_layer_evicts_by_size(self):
+        """Test the memory layer drops least recently used entries above its byte budget."""
+        cache = GeminiCache(max_memory_bytes=250)
+        cache.put("a", b"x" * 100)
+        cache.put("b", b"x" * 100)
+        cache.get("a")
+        cache.put("c", b"x" * 100)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_disk_layer_prunes_oldest_files(self, temp_dir):
+        """Test prune_disk deletes the oldest files until the directory fits its budget."""
+        cache = GeminiCache(cache_dir=temp_dir, max_disk_bytes=250)
+        for age, key in enumerate(["aa01", "bb02", "cc03"]):
+            cache.put(key, b"x" * 100)
+            os.utime(cache._path(key), (1000 + age, 1000 + age))
+
+        assert cache.prune_disk() == 1
+        assert not cache._path("aa01").exists()
+        assert cache._path("bb02").exists()
+        assert cache._path("cc03").exists()
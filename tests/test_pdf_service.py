@@ -1,12 +1,15 @@
 """Tests for PDFService."""
 
+import io
 import os
 import tempfile
+from unittest.mock import patch
 
 import pytest
 from fpdf import FPDF
+from PIL import Image
 
-from app.services.pdf_service import PDFService
+from app.services.pdf_service import PDFService, _prepare_image, shutdown_process_pool
 
 
 class TestPDFService:
@@ -30,6 +33,77 @@ class TestPDFService:
         assert len(pdf_bytes) > 0
         assert pdf_bytes.startswith(b"%PDF")
 
+    def test_create_pdf_from_images_embeds_jpeg_as_is(self):
+        """Test JPEG pages are embedded without being re-encoded."""
+        service = PDFService()
+        buffer = io.BytesIO()
+        Image.new("RGB", (120, 80), color="blue").save(buffer, format="JPEG")
+        jpeg_bytes = buffer.getvalue()
+        
+        pdf_bytes = service.create_pdf_from_images([jpeg_bytes])
+        
+        assert b"/DCTDecode" in pdf_bytes
+        assert jpeg_bytes in pdf_bytes
+
+    def test_create_pdf_from_images_passes_rgb_png_through(self, sample_image_bytes):
+        """Test 8-bit RGB PNG pages are handed to FPDF without a PIL round trip."""
+        service = PDFService()
+        
+        with patch("app.services.pdf_service.Image") as mock_image:
+            pdf_bytes = service.create_pdf_from_images([sample_image_bytes])
+        
+        mock_image.open.assert_not_called()
+        assert b"/Subtype /Image" in pdf_bytes
+
+    def test_prepare_image_puts_transparency_on_white(self):
+        """Test transparent pixels become white instead of black."""
+        img = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
+        img.putpixel((0, 0), (255, 0, 0, 255))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        
+        prepared, width, height = _prepare_image(buffer.getvalue())
+        
+        assert (width, height) == (10, 10)
+        assert prepared.mode == "RGB"
+        assert prepared.getpixel((0, 0)) == (255, 0, 0)
+        assert prepared.getpixel((5, 5)) == (255, 255, 255)
+
+    def test_create_pdf_from_images_reencodes_as_jpeg_or_png(self):
+        """Test output_format controls how re-encoded pages are embedded."""
+        service = PDFService()
+        buffer = io.BytesIO()
+        Image.new("RGBA", (40, 40), (0, 128, 0, 128)).save(buffer, format="PNG")
+        
+        jpeg_pdf = service.create_pdf_from_images([buffer.getvalue()])
+        png_pdf = service.create_pdf_from_images([buffer.getvalue()], output_format="PNG")
+        
+        assert b"/DCTDecode" in jpeg_pdf
+        assert b"/DCTDecode" not in png_pdf
+        with pytest.raises(ValueError):
+            service.create_pdf_from_images([buffer.getvalue()], output_format="GIF")
+
+    def test_prepare_image_downscales_to_max_size(self):
+        """Test re-encoded images larger than max_size are downscaled."""
+        buffer = io.BytesIO()
+        Image.new("RGBA", (400, 200), (0, 0, 255, 255)).save(buffer, format="PNG")
+        
+        _, width, height = _prepare_image(buffer.getvalue(), max_size=(100, 100))
+        
+        assert (width, height) == (100, 50)
+
+    def test_create_pdf_from_images_prepares_repeated_images_once(self, sample_image_bytes):
+        """Test the same image is prepared once across pages and PDFs."""
+        service = PDFService()
+
+        with patch("app.services.pdf_service._prepare_image", wraps=_prepare_image) as prepare:
+            first = service.create_pdf_from_images([sample_image_bytes, sample_image_bytes])
+            second = service.create_pdf_from_images([sample_image_bytes])
+
+        assert prepare.call_count == 1
+        assert first.startswith(b"%PDF")
+        assert second.startswith(b"%PDF")
+
     def test_create_pdf_from_images_saves_to_file(self, temp_dir, sample_image_bytes):
         """Test creating PDF and saving to file."""
         service = PDFService()
@@ -43,6 +117,29 @@ class TestPDFService:
         assert os.path.exists(output_path)
         assert os.path.getsize(output_path) > 0
 
+    def test_stream_pdf_from_images_yields_chunks(self, sample_image_bytes):
+        """Test streamed chunks join into a complete PDF."""
+        service = PDFService()
+
+        chunks = list(service.stream_pdf_from_images([sample_image_bytes], chunk_size=256))
+
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 256 for chunk in chunks)
+        pdf_bytes = b"".join(chunks)
+        assert pdf_bytes.startswith(b"%PDF")
+        assert pdf_bytes.rstrip().endswith(b"%%EOF")
+
+    async def test_create_pdf_from_images_async(self, sample_image_bytes):
+        """Test creating a PDF in the process pool."""
+        service = PDFService()
+
+        try:
+            pdf_bytes = await service.create_pdf_from_images_async([sample_image_bytes])
+        finally:
+            shutdown_process_pool()
+
+        assert pdf_bytes.startswith(b"%PDF")
+
     def test_create_pdf_from_empty_images_list(self):
         """Test creating PDF with empty images list."""
         service = PDFService()
@@ -125,6 +222,27 @@ class TestPDFService:
         assert os.path.exists(pdf_path)
         assert os.path.getsize(pdf_path) > 0
 
+    def test_create_digital_kit_reuses_prepared_images(
+        self, temp_dir, multiple_art_images, sample_pet_data
+    ):
+        """Test a second kit with the same images is built from the prepared-image cache."""
+        service = PDFService()
+        kit_args = dict(
+            pet_name=sample_pet_data["pet_name"],
+            pet_date=sample_pet_data["pet_date"],
+            pet_story=sample_pet_data["pet_story"],
+            generated_art_paths=multiple_art_images,
+            output_dir=temp_dir,
+        )
+
+        with patch("app.services.pdf_service._prepare_image", wraps=_prepare_image) as prepare:
+            service.create_digital_kit(**kit_args)
+            first_kit_calls = prepare.call_count
+            service.create_digital_kit(**kit_args)
+
+        assert first_kit_calls >= 1
+        assert prepare.call_count == first_kit_calls
+
     def test_create_digital_kit_with_no_art_images(self, temp_dir, sample_pet_data):
         """Test creating digital kit fails with no art images."""
         service = PDFService()